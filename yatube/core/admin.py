@@ -0,0 +1,87 @@
+from django import forms
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
+
+# Верхняя граница для строк с заданным префиксом: больше нее в UTF-8
+# нет ни одного символа.
+PREFIX_END = '\U0010ffff'
+
+
+class PrefixSearchMixin:
+    """Поиск в админке по началу значения через диапазон по индексу.
+
+    ``istartswith`` из search_fields превращается в LIKE, который SQLite
+    не ведет по обычному индексу. Здесь префикс ищется как
+    ``field >= term AND field < term + PREFIX_END`` по каждому полю из
+    ``prefix_search_fields``, с учетом регистра.
+    """
+    prefix_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q()
+        for field in self.prefix_search_fields:
+            condition |= Q(**{
+                f'{field}__gte': term,
+                f'{field}__lt': term + PREFIX_END,
+            })
+        return queryset.filter(condition), False
+
+
+class LabeledAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое берет подпись выбранного значения из labels.
+
+    Обычный виджет ищет подпись отдельным запросом, то есть по запросу
+    на каждую строку list_editable. Если подписи нет в labels, виджет
+    ведет себя как обычный.
+    """
+    labels = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [
+            option for option in value
+            if option not in self.choices.field.empty_values
+        ]
+        if self.labels is None or not set(selected) <= set(self.labels):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for option in selected:
+            options.append(self.create_option(
+                name, option, self.labels[option], True, len(options)))
+        return [(None, options, 0)]
+
+
+class RowLabelsForm(forms.ModelForm):
+    """Форма строки списка: подписи автодополнения берутся из строки.
+
+    Связанные объекты строки уже загружены через list_select_related.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, LabeledAutocompleteSelect):
+                related = getattr(self.instance, name, None)
+                widget.labels = {} if related is None else {
+                    str(related.pk): str(related)}
+
+
+class AutocompleteMixin:
+    """Автодополнение autocomplete_fields без запросов на каждую строку."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if ('widget' not in kwargs
+                and db_field.name in self.get_autocomplete_fields(request)):
+            kwargs['widget'] = LabeledAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', RowLabelsForm)
+        return super().get_changelist_form(request, **kwargs)
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+# Прагмы, с которыми соединение открывается без настройки: модуль
+# sqlite3 по умолчанию ждет блокировку 5 секунд.
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+}
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
+
+
+def _worker(path, pragmas, deadline, work, totals, key):
+    done = errors = 0
+    db = sqlite3.connect(path, timeout=0, isolation_level=None)
+    for statement in pragma_statements(pragmas):
+        db.execute(statement)
+    while time.monotonic() < deadline:
+        try:
+            work(db)
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    db.close()
+    with totals['lock']:
+        totals[key] += done
+        totals['errors'] += errors
+
+
+def _read(db):
+    db.execute(
+        'SELECT id, text FROM comment WHERE post_id = ? '
+        'ORDER BY created DESC LIMIT 10', (int(time.time_ns()) % 100,)
+    ).fetchall()
+
+
+def _write(db):
+    db.execute(
+        'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+        (int(time.time_ns()) % 100, 'Комментарий', time.time()),
+    )
+
+
+def benchmark(pragmas, seconds, readers, writers, rows=10000):
+    """Нагружает временную базу чтениями и записями из потоков.
+
+    Схема повторяет комментарии: записи вставляются по одной
+    в автокоммите, как в add_comment, чтения выбирают ленту
+    комментариев поста. Возвращает словарь с числом чтений,
+    записей и ошибок «database is locked» за ``seconds`` секунд.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        db = sqlite3.connect(path, isolation_level=None)
+        for statement in pragma_statements(pragmas):
+            db.execute(statement)
+        db.execute(
+            'CREATE TABLE comment (id INTEGER PRIMARY KEY, '
+            'post_id INTEGER, text TEXT, created REAL)')
+        db.execute('CREATE INDEX comment_post ON comment (post_id, created)')
+        db.executemany(
+            'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+            ((number % 100, 'Комментарий', number) for number in range(rows)),
+        )
+        db.close()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0,
+                  'lock': threading.Lock()}
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(path, pragmas, deadline, work, totals, key),
+            )
+            for work, key, count in (
+                (_read, 'reads', readers), (_write, 'writes', writers))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    del totals['lock']
+    return totals
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import db
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с прагмами по умолчанию '
+        'и с SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=5,
+            help='Длительность каждого прогона.',
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Число читающих потоков.',
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=2,
+            help='Число пишущих потоков.',
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('По умолчанию', db.DEFAULT_PRAGMAS),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for title, pragmas in profiles:
+            totals = db.benchmark(
+                pragmas,
+                options['seconds'],
+                options['readers'],
+                options['writers'],
+            )
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{title}: чтений в секунду {totals["reads"] / seconds:.0f}, '
+                f'записей в секунду {totals["writes"] / seconds:.0f}, '
+                f'ошибок блокировки {totals["errors"]}'
+            )
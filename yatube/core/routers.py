@@ -0,0 +1,123 @@
+import random
+import threading
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'read_primary'
+
+_state = threading.local()
+
+
+def read_only(view):
+    """Помечает view, чьи запросы на чтение можно отдать реплике."""
+    view.read_only = True
+    return view
+
+
+def use_replicas():
+    return getattr(_state, 'use_replicas', False)
+
+
+def read_from_primary():
+    """Отправляет остальные чтения текущего запроса в основную базу."""
+    _state.use_replicas = False
+
+
+def _mark_write():
+    _state.wrote = True
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для view, помеченных read_only.
+
+    После запроса, который что-то записал в базу, браузер получает
+    cookie PIN_COOKIE на REPLICA_PIN_SECONDS секунд. Пока она есть,
+    все чтения идут в основную базу, и пользователь сразу видит свои
+    изменения, даже если реплика отстает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.use_replicas = False
+        if _state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.use_replicas = (
+            getattr(view_func, 'read_only', False)
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+
+class ReplicaRouter:
+    """Отправляет чтения read_only-view на случайную из DATABASE_REPLICAS.
+
+    Остальное идет в default явно: иначе Django взял бы базу объекта
+    из подсказки instance, например пользователя подписки искал бы
+    в базе подписок.
+    """
+
+    def db_for_read(self, model, **hints):
+        if use_replicas() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _mark_write()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class FollowRouter:
+    """Отправляет подписки и ленты в базу FOLLOW_DATABASE, если она задана.
+
+    Так запись подписок не ждет общую блокировку записи основной базы.
+    Модели перечислены в FOLLOW_MODELS, остальные в эту базу
+    не мигрируются. В основной базе таблицы подписок остаются,
+    чтобы проходили старые миграции с данными, но не используются.
+    """
+
+    def _db(self, model):
+        database = settings.FOLLOW_DATABASE
+        if database and model._meta.label_lower in settings.FOLLOW_MODELS:
+            return database
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model)
+
+    def db_for_write(self, model, **hints):
+        _mark_write()
+        return self._db(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._db(obj1._meta.model) or self._db(obj2._meta.model):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not db or db != settings.FOLLOW_DATABASE:
+            return None
+        return f'{app_label}.{model_name}' in settings.FOLLOW_MODELS
@@ -1,6 +1,19 @@
 from http import HTTPStatus
+from io import StringIO
 
-from django.test import TestCase, Client
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from posts.cache import bump_generation, cache_listing
+from posts.models import FeedEntry, Follow, Post
+
+from . import db, routers
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -11,3 +24,112 @@ class ViewTestClass(TestCase):
         response = self.guest_client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SqlitePragmasTest(TestCase):
+    def test_connection_uses_pragmas(self):
+        """Соединение получает прагмы из SQLITE_PRAGMAS"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_benchmark_counts_operations(self):
+        """Бенчмарк считает чтения и записи без ошибок блокировки"""
+        totals = db.benchmark(
+            settings.SQLITE_PRAGMAS, 0.2, readers=2, writers=2, rows=100)
+        self.assertGreater(totals['reads'], 0)
+        self.assertGreater(totals['writes'], 0)
+        self.assertEqual(totals['errors'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def route(self, view, request):
+        """Пропускает запрос через middleware; отдает базу для чтения."""
+        seen = {}
+
+        def handler(request):
+            middleware.process_view(request, view, (), {})
+            seen['db'] = router.db_for_read(User)
+            return view(request)
+
+        middleware = routers.ReplicaMiddleware(handler)
+        response = middleware(request)
+        return seen['db'], response
+
+    def test_read_only_view_reads_from_replica(self):
+        """GET к read_only-view читает с реплики"""
+        view = routers.read_only(lambda request: HttpResponse())
+        db_alias, response = self.route(view, self.factory.get('/'))
+        self.assertEqual(db_alias, 'replica1')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_other_views_read_from_primary(self):
+        """Непомеченные view и POST читают из основной базы"""
+        view = routers.read_only(lambda request: HttpResponse())
+        cases = (
+            (lambda request: HttpResponse(), self.factory.get('/')),
+            (view, self.factory.post('/')),
+        )
+        for case_view, request in cases:
+            with self.subTest(method=request.method):
+                self.assertEqual(self.route(case_view, request)[0], 'default')
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи чтения идут в основную базу, пока есть cookie"""
+        def writing_view(request):
+            User.objects.create_user(username='writer')
+            return HttpResponse()
+
+        response = self.route(writing_view, self.factory.post('/'))[1]
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = '1'
+        view = routers.read_only(lambda request: HttpResponse())
+        self.assertEqual(self.route(view, request)[0], 'default')
+
+    def test_fresh_page_is_rendered_from_primary(self):
+        """После сброса поколения страница кешируется с основной базы"""
+        seen = []
+
+        @routers.read_only
+        @cache_listing('replica-test')
+        def view(request):
+            seen.append(router.db_for_read(User))
+            return HttpResponse()
+
+        cache.clear()
+        self.route(view, self.factory.get('/'))
+        bump_generation('replica-test')
+        self.route(view, self.factory.get('/'))
+        self.assertEqual(seen, ['replica1', 'default'])
+
+
+@override_settings(FOLLOW_DATABASE='follows')
+class FollowRouterTest(TestCase):
+    def test_follow_models_use_follow_database(self):
+        """Подписки и ленты читаются и пишутся в FOLLOW_DATABASE"""
+        for model in (Follow, FeedEntry):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(router.db_for_read(model), 'follows')
+                self.assertEqual(router.db_for_write(model), 'follows')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_migrations_are_split(self):
+        """В базу подписок мигрируются только подписки и ленты"""
+        self.assertTrue(router.allow_migrate_model('follows', Follow))
+        self.assertFalse(router.allow_migrate_model('follows', Post))
+        self.assertTrue(router.allow_migrate_model('default', Post))
+        self.assertTrue(router.allow_migrate_model('default', User))
+
+    @override_settings(FOLLOW_DATABASE=None)
+    def test_copy_follows_needs_follow_database(self):
+        """Без FOLLOW_DATABASE копировать подписки некуда"""
+        with self.assertRaises(CommandError):
+            call_command('copy_follows', stdout=StringIO())
@@ -1,9 +1,30 @@
+from core.admin import AutocompleteMixin, PrefixSearchMixin
 from django.contrib import admin
+from django.db import connection
 
+from . import search
+from .cache import admin_scope
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(AutocompleteMixin, admin.ModelAdmin):
+    """Список без COUNT(*) по всей таблице на каждое открытие."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(
+            queryset,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            count_scope=admin_scope(self.model),
+        )
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,13 +32,24 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group'
     )
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     list_editable = ('group',)
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по всей таблице."""
+        matching = search.matching_ids(search_term)
+        if connection.vendor != 'sqlite' or matching is None:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(id__in=matching), False
 
-class GroupAdmin(admin.ModelAdmin):
+
+class GroupAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
@@ -25,22 +57,34 @@ class GroupAdmin(admin.ModelAdmin):
         'description',
     )
     search_fields = ('title',)
+    prefix_search_fields = ('title', 'slug')
+    ordering = ('title',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'post',
         'author',
         'text'
     )
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = (
         'user',
         'author',
     )
+    # Подписки могут лежать в другой базе: пользователи подгружаются
+    # отдельным запросом, а не через JOIN.
+    list_select_related = ()
+    autocomplete_fields = ('user', 'author')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,56 @@
+import datetime as dt
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def cutoff(days):
+    """Момент, раньше которого посты считаются старыми."""
+    return timezone.now() - dt.timedelta(days=days)
+
+
+def _move(post_ids):
+    comments = list(
+        Comment.objects.filter(post_id__in=post_ids)
+        .values(*_columns(ArchivedComment))
+    )
+    ArchivedComment.objects.bulk_create(
+        ArchivedComment(**row) for row in comments)
+    # Удаление идет через сигналы: счетчики, ссылки на картинки,
+    # варианты, записи лент и кеш страниц обновляются как обычно.
+    Post.objects.filter(id__in=post_ids).delete()
+    return len(comments)
+
+
+def archive(before, batch_size):
+    """Переносит посты старше ``before`` с комментариями в архив.
+
+    Каждая пачка из ``batch_size`` самых старых постов переносится
+    в своей транзакции, поэтому прерванный перенос продолжается
+    повторным запуском. Отдает пары (постов, комментариев) пачки.
+    """
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Post.objects.filter(pub_date__lt=before)
+                .order_by('pub_date', 'id')
+                .values(*_columns(ArchivedPost))[:batch_size]
+            )
+            if not rows:
+                return
+            ArchivedPost.objects.bulk_create(
+                ArchivedPost(**row) for row in rows)
+            moved = _move([row['id'] for row in rows])
+            authors = Counter(row['author_id'] for row in rows)
+            for author_id, count in authors.items():
+                counters.change_profile(
+                    author_id, 'archived_posts_count', count)
+        yield len(rows), moved
@@ -0,0 +1,138 @@
+import time
+from functools import wraps
+
+from core.routers import read_from_primary
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def _version_key(post_id):
+    return f'post:{post_id}:version'
+
+
+def _card_key(post_id):
+    return f'post:{post_id}:card'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def bump_version(post_id):
+    """Делает устаревшей закешированную карточку поста."""
+    try:
+        cache.incr(_version_key(post_id))
+    except ValueError:
+        cache.set(_version_key(post_id), _new_version(), None)
+
+
+def render_cards(posts, prepare=None):
+    """Возвращает HTML карточек постов страницы.
+
+    Версии и карточки всех постов читаются одним get_many. Карточка
+    хранится вместе с версией поста, на которой она отрисована, и
+    перерисовывается, как только версия поста сменилась. ``prepare``
+    получает разом все посты, чьи карточки придется перерисовать.
+    """
+    posts = list(posts)
+    cached = cache.get_many(
+        [_version_key(post.id) for post in posts]
+        + [_card_key(post.id) for post in posts]
+    )
+    cards, stale = {}, []
+    for post in posts:
+        version = cached.get(_version_key(post.id))
+        if version is None:
+            version = _new_version()
+            cache.add(_version_key(post.id), version, None)
+        card = cached.get(_card_key(post.id))
+        if card is None or card[0] != version:
+            stale.append((post, version))
+        else:
+            cards[post.id] = card[1]
+    if stale and prepare is not None:
+        prepare([post for post, version in stale])
+    rendered = {}
+    for post, version in stale:
+        cards[post.id] = render_to_string(CARD_TEMPLATE, {'post': post})
+        rendered[_card_key(post.id)] = (version, cards[post.id])
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TIMEOUT)
+    return [cards[post.id] for post in posts]
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def admin_scope(model):
+    return f'admin:{model._meta.label_lower}'
+
+
+def _generation_key(scope):
+    return f'page:{scope}:generation'
+
+
+def generation(scope):
+    value = cache.get(_generation_key(scope))
+    if value is None:
+        value = _new_version()
+        if not cache.add(_generation_key(scope), value, None):
+            value = cache.get(_generation_key(scope), value)
+    return value
+
+
+def _fresh_key(scope):
+    return f'page:{scope}:fresh'
+
+
+def bump_generation(*scopes):
+    """Сбрасывает все закешированные страницы перечисленных областей.
+
+    При репликах области еще REPLICA_PIN_SECONDS считаются свежими:
+    их страницы читаются из основной базы, чтобы в кеш нового
+    поколения не попала копия с отстающей реплики.
+    """
+    for scope in scopes:
+        try:
+            cache.incr(_generation_key(scope))
+        except ValueError:
+            cache.set(_generation_key(scope), _new_version(), None)
+    if settings.DATABASE_REPLICAS and scopes:
+        cache.set_many(
+            {_fresh_key(scope): True for scope in scopes},
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+
+def cache_listing(scope):
+    """Кеширует view на PAGE_CACHE_TIMEOUT внутри поколения области.
+
+    ``scope`` — имя области или функция, строящая его из аргументов
+    view. Поколение входит в key_prefix, поэтому bump_generation
+    сбрасывает сразу все номера страниц и варианты query string.
+    """
+    def decorator(view):
+        view = vary_on_cookie(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = scope(*args, **kwargs) if callable(scope) else scope
+            if settings.DATABASE_REPLICAS and cache.get(_fresh_key(name)):
+                read_from_primary()
+            cached_view = cache_page(
+                settings.PAGE_CACHE_TIMEOUT,
+                key_prefix=f'{name}:{generation(name)}',
+            )(view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from users.models import Profile
+
+from .models import ArchivedPost, Comment, Follow, Post, StoredImage
+
+User = get_user_model()
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_profile(user_id, field, delta):
+    """Атомарно меняет счетчик профиля, создавая профиль при нужде."""
+    profiles = Profile.objects.filter(user_id=user_id)
+    if not _change(profiles, field, delta) and delta > 0:
+        Profile.objects.get_or_create(user_id=user_id)
+        _change(profiles, field, delta)
+
+
+def change_comments(post_id, delta):
+    _change(Post.objects.filter(id=post_id), 'comments_count', delta)
+
+
+def change_refs(name, delta):
+    """Меняет число постов, ссылающихся на файл картинки."""
+    images = StoredImage.objects.filter(name=name)
+    if not _change(images, 'refs', delta) and delta > 0:
+        StoredImage.objects.get_or_create(name=name)
+        _change(images, 'refs', delta)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+COUNTERS = (
+    (Post, 'comments_count', Comment.objects.all(), 'post'),
+    (Profile, 'posts_count', Post.objects.all(), 'author'),
+    (Profile, 'archived_posts_count', ArchivedPost.objects.all(), 'author'),
+    (Profile, 'followers_count', Follow.objects.all(), 'author'),
+    (Profile, 'following_count', Follow.objects.all(), 'user'),
+    (StoredImage, 'refs', Post.objects.all(), 'image'),
+)
+
+
+def _reconcile_across(model, field, related, related_field):
+    """Сверка счетчика, когда связанная таблица лежит в другой базе."""
+    actual = dict(
+        related.order_by().values_list(related_field).annotate(
+            total=Count('pk'))
+    )
+    drifted = [
+        (pk, actual.get(pk, 0))
+        for pk, value in model.objects.values_list('pk', field).iterator()
+        if value != actual.get(pk, 0)
+    ]
+    for pk, value in drifted:
+        model.objects.filter(pk=pk).update(**{field: value})
+    return len(drifted)
+
+
+def reconcile():
+    """Пересчитывает разошедшиеся счетчики. Возвращает число правок."""
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(
+                profile__isnull=True).values_list('id', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    StoredImage.objects.bulk_create(
+        (
+            StoredImage(name=name)
+            for name in Post.objects.exclude(image='').exclude(
+                image__in=StoredImage.objects.values('name')
+            ).values_list('image', flat=True).distinct()
+        ),
+        ignore_conflicts=True,
+    )
+    fixed = {}
+    for model, field, related, related_field in COUNTERS:
+        if router.db_for_read(related.model) != router.db_for_read(model):
+            fixed[f'{model.__name__}.{field}'] = _reconcile_across(
+                model, field, related, related_field)
+            continue
+        actual = _count(related, related_field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')})
+        fixed[f'{model.__name__}.{field}'] = model.objects.filter(
+            pk__in=drifted.values('pk')).update(**{field: actual})
+    return fixed
@@ -0,0 +1,38 @@
+from base64 import b64encode
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Модуль не импортирует Django: процессы пула вариантов стартуют через
+# forkserver и загружают отсюда только Pillow, без настроек и моделей.
+
+
+def _placeholder(source, width, ratio):
+    image = ImageOps.fit(
+        source.convert('RGB'), (width, max(1, round(width * ratio))))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=50)
+    return 'data:image/jpeg;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def encode(data, widths, ratio, formats, quality, placeholder_width):
+    """Кодирует варианты картинки; выполняется в отдельном процессе.
+
+    Возвращает тройки (формат, ширина, байты) с тем же кадрированием,
+    что у миниатюры карточки, и крошечную заглушку в виде data URI.
+    Ширины больше исходной пропускаются.
+    """
+    encoded = []
+    with Image.open(BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+        fitting = [width for width in widths if width <= source.width]
+        for width in fitting or [min(widths)]:
+            image = ImageOps.fit(
+                source, (width, round(width * ratio)), Image.LANCZOS)
+            for image_format in formats:
+                buffer = BytesIO()
+                image.save(buffer, image_format.upper(), quality=quality)
+                encoded.append((image_format, width, buffer.getvalue()))
+        placeholder = _placeholder(source, placeholder_width, ratio)
+    return encoded, placeholder
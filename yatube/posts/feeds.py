@@ -0,0 +1,148 @@
+import datetime as dt
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from users.models import Profile
+
+from .models import FeedEntry, Follow, Post
+
+
+def retention_cutoff(days=None):
+    if days is None:
+        days = settings.FEED_RETENTION_DAYS
+    return timezone.now() - dt.timedelta(days=days)
+
+
+def _insert(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, settings.FEED_BATCH_SIZE))
+    while batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, settings.FEED_BATCH_SIZE))
+
+
+def is_pulled(author_id):
+    """Посты автора с большим числом подписчиков читаются при запросе."""
+    return Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_PULL_THRESHOLD,
+    ).exists()
+
+
+def pulled_author_ids(user_id):
+    # Подписки могут лежать в другой базе, поэтому без подзапроса.
+    followed = list(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True))
+    return Profile.objects.filter(
+        user_id__in=followed,
+        followers_count__gt=settings.FEED_PULL_THRESHOLD,
+    ).values_list('user_id', flat=True)
+
+
+def streams(user):
+    """Потоки ленты для MergedKeysetPaginator.
+
+    Записи ленты дополняются постами авторов, которые не раскладываются
+    при публикации; ключ у всех потоков — (pub_date, id поста).
+    """
+    yield user.feed_entries.all(), ('pub_date', 'post_id')
+    for author_id in pulled_author_ids(user.id):
+        posts = Post.objects.filter(author_id=author_id)
+        yield posts.select_related('author', 'group'), ('pub_date', 'id')
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id, cutoff=None):
+    """Добавляет в ленту подписчика посты автора за срок хранения."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id,
+        pub_date__gte=cutoff or retention_cutoff(),
+    ).values_list('id', 'pub_date')
+    _insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def switch_delivery(author_id, delta):
+    """Переводит автора между раскладкой и чтением при запросе.
+
+    Вызывается после изменения числа подписчиков на ``delta``. Когда
+    автор переходит порог FEED_PULL_THRESHOLD вверх, его записи лент
+    удаляются: посты читаются при запросе и иначе дублировались бы.
+    Когда опускается до порога, ленты подписчиков заполняются заново,
+    иначе посты, опубликованные без раскладки, из лент пропали бы.
+    """
+    threshold = settings.FEED_PULL_THRESHOLD
+    followers_count = Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    if delta > 0 and followers_count == threshold + 1:
+        FeedEntry.objects.filter(author_id=author_id).delete()
+    elif delta < 0 and followers_count == threshold:
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        for user_id in followers.iterator():
+            backfill(user_id, author_id)
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim(cutoff=None):
+    """Удаляет записи лент старше срока хранения."""
+    deleted, _ = FeedEntry.objects.filter(
+        pub_date__lt=cutoff or retention_cutoff()).delete()
+    return deleted
+
+
+def rebuild(cutoff=None):
+    """Пересобирает ленты по таблице подписок."""
+    cutoff = cutoff or retention_cutoff()
+    stale = FeedEntry.objects.annotate(
+        followed=Exists(Follow.objects.filter(
+            user_id=OuterRef('user_id'), author_id=OuterRef('author_id')))
+    ).filter(followed=False)
+    FeedEntry.objects.filter(pk__in=stale.values('pk')).delete()
+    trim(cutoff)
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id, cutoff)
+
+
+def load_posts(rows):
+    """Заменяет записи ленты постами, сохраняя порядок."""
+    posts = Post.objects.select_related('author', 'group').in_bulk([
+        row.post_id for row in rows if isinstance(row, FeedEntry)
+    ])
+    return [
+        posts.get(row.post_id) if isinstance(row, FeedEntry) else row
+        for row in rows
+        if not isinstance(row, FeedEntry) or row.post_id in posts
+    ]
@@ -8,6 +8,16 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        error = getattr(self.files.get('image'), 'error', None)
+        if error:
+            # error_messages общий с base_fields: меняем копию, иначе
+            # сообщение осталось бы у всех следующих форм воркера.
+            field = self.fields['image']
+            field.error_messages = {
+                **field.error_messages, 'invalid_image': error}
+
     def clean_text(self):
         data = self.cleaned_data['text']
         if data == '':
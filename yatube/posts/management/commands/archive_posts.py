@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Переносить посты старше указанного числа дней.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help='Сколько постов переносить за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['older_than_days'])
+        posts = comments = 0
+        for moved_posts, moved_comments in archive.archive(
+                before, options['batch_size']):
+            posts += moved_posts
+            comments += moved_comments
+            self.stdout.write(f'Перенесено постов: {posts}')
+        self.stdout.write(
+            f'Готово. Перенесено постов: {posts}, '
+            f'комментариев: {comments}'
+        )
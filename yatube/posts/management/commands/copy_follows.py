@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from posts import counters, transfer
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует подписки и ленты из основной базы в FOLLOW_DATABASE. '
+        'Запускается один раз после включения DB_FOLLOWS и '
+        'migrate --database follows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TRANSFER_BATCH_SIZE,
+            help='Сколько строк писать одним bulk_create.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.FOLLOW_DATABASE:
+            raise CommandError(
+                'База подписок не настроена: задайте DB_FOLLOWS.')
+        for label, count, seconds in transfer.copy(
+                (Follow, FeedEntry), DEFAULT_DB_ALIAS,
+                options['batch_size']):
+            rate = count / seconds if seconds else count
+            self.stdout.write(
+                f'{label}: скопировано строк {count}, {rate:.0f} в секунду')
+        counters.reconcile()
+        self.stdout.write('Готово. Счетчики подписок сверены.')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в JSONL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл, куда писать строки.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TRANSFER_BATCH_SIZE,
+            help='Сколько строк читать из базы за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'w', encoding='utf-8') as stream:
+            for label, count, seconds in transfer.export(
+                    stream, options['batch_size']):
+                rate = count / seconds if seconds else count
+                self.stdout.write(
+                    f'{label}: выгружено строк {count}, {rate:.0f} в секунду')
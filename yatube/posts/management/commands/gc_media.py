@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = 'Удаляет картинки и миниатюры, на которые не ссылаются посты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать, сколько места освободится.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MEDIA_BATCH_SIZE,
+            help='Размер пачки для запросов и удаления.',
+        )
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=60,
+            help='Не трогать файлы моложе указанного числа минут.',
+        )
+
+    def handle(self, *args, **options):
+        found, size = media.collect(
+            options['batch_size'],
+            options['grace_minutes'] * 60,
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(
+                f'Можно удалить файлов: {found}, освободится байт: {size}')
+        else:
+            self.stdout.write(
+                f'Удалено файлов: {found}, освобождено байт: {size}')
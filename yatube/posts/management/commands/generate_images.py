@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры, варианты и заглушки картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать для всех постов, а не только без заглушки.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(placeholder='')
+        post_ids = list(posts.values_list('id', flat=True))
+        for post_id in post_ids:
+            thumbnails.generate(post_id)
+        self.stdout.write(f'Обработано постов: {len(post_ids)}')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import counters, feeds, transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает строки из JSONL, выгруженного export_jsonl.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл со строками.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TRANSFER_BATCH_SIZE,
+            help='Сколько строк писать одним bulk_create.',
+        )
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding='utf-8') as stream:
+            for label, count, seconds in transfer.load(
+                    stream, options['batch_size']):
+                rate = count / seconds if seconds else count
+                self.stdout.write(
+                    f'{label}: загружено строк {count}, {rate:.0f} в секунду')
+        counters.reconcile()
+        feeds.rebuild()
+        self.stdout.write('Готово. Счетчики и ленты пересчитаны.')
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+from posts.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок и удаляет устаревшие записи.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.FEED_RETENTION_DAYS,
+            help='Срок хранения записей ленты в днях.',
+        )
+        parser.add_argument(
+            '--trim-only',
+            action='store_true',
+            help='Только удалить записи старше срока хранения.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = feeds.retention_cutoff(options['retention_days'])
+        if options['trim_only']:
+            deleted = feeds.trim(cutoff)
+            self.stdout.write(f'Удалено записей: {deleted}')
+            return
+        feeds.rebuild(cutoff)
+        self.stdout.write(f'Записей в лентах: {FeedEntry.objects.count()}')
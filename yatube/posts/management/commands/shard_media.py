@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = 'Переносит картинки постов в шардированные каталоги.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MEDIA_BATCH_SIZE,
+            help='Сколько постов переносить за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        total = skipped = 0
+        for moved, missing in media.shard(options['batch_size']):
+            total += moved
+            skipped += missing
+            self.stdout.write(f'Перенесено постов: {total}')
+        self.stdout.write(
+            f'Готово. Перенесено постов: {total}, '
+            f'файлов не найдено: {skipped}'
+        )
@@ -0,0 +1,233 @@
+import os
+import time
+from collections import Counter
+
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from . import cache, counters, thumbnails
+from .models import ArchivedPost, ImageVariant, Post, StoredImage
+
+storage = Post._meta.get_field('image').storage
+
+
+def _move(name):
+    """Копирует файл в шардированный каталог и возвращает новое имя."""
+    upload_to = Post._meta.get_field('image').upload_to
+    with storage.open(name, 'rb') as image:
+        return storage.save(
+            os.path.join(upload_to, os.path.basename(name)), image)
+
+
+def _relink(moved):
+    """Переписывает image у всех постов с перенесенными файлами.
+
+    Архивные посты делят файлы с горячими, поэтому переписываются
+    тоже, иначе ссылались бы на удаленный старый файл.
+    """
+    if not moved:
+        return []
+    posts = list(Post.objects.filter(image__in=list(moved)).select_related(
+        'author', 'group'))
+    archived = list(ArchivedPost.objects.filter(
+        image__in=list(moved)).select_related('author', 'group'))
+    refs = Counter(moved[post.image.name] for post in posts)
+    relinked = posts + archived
+    for post in relinked:
+        post.image = moved[post.image.name]
+    with transaction.atomic():
+        Post.objects.bulk_update(posts, ['image'])
+        ArchivedPost.objects.bulk_update(archived, ['image'])
+        StoredImage.objects.filter(name__in=list(moved)).delete()
+        for name, count in refs.items():
+            counters.change_refs(name, count)
+    for post in relinked:
+        cache.bump_version(post.id)
+    cache.bump_generation(
+        'index',
+        *{cache.profile_scope(post.author.username) for post in relinked},
+        *{cache.group_scope(post.group.slug)
+          for post in relinked if post.group},
+    )
+    return relinked
+
+
+def _shard(model, pattern, batch_size):
+    last_id = 0
+    while True:
+        batch = list(
+            model.objects.filter(id__gt=last_id).exclude(image='')
+            .exclude(image__regex=pattern).order_by('id')
+            .values_list('id', 'image')[:batch_size]
+        )
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        moved, missing = {}, 0
+        for name in {name for post_id, name in batch}:
+            try:
+                moved[name] = _move(name)
+            except OSError:
+                missing += 1
+        posts = _relink(moved)
+        # Миниатюры sorl привязаны к имени исходника.
+        for image in {post.image.name: post.image for post in posts}.values():
+            thumbnails.render(image)
+        for name, new_name in moved.items():
+            if name != new_name:
+                storage.delete(name)
+        yield len(posts), missing
+
+
+def shard(batch_size):
+    """Раскладывает картинки постов по шардам, отдает итоги пачек.
+
+    Сначала обходятся горячие посты, потом архивные. Посты с уже
+    разложенными картинками в выборку не попадают, поэтому прерванный
+    перенос продолжается повторным запуском. Старый файл удаляется
+    только после того, как все ссылки на него переписаны. Миниатюры
+    под новыми именами строятся сразу, иначе карточки показывали бы
+    оригиналы. Для каждой пачки отдается пара (перенесено постов,
+    пропущено файлов).
+    """
+    pattern = storage.sharded_pattern()
+    for model in (Post, ArchivedPost):
+        yield from _shard(model, pattern, batch_size)
+
+
+def _chunks(queryset, batch_size):
+    last_pk = None
+    queryset = queryset.order_by('pk')
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', 'image')[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield [name for pk, name in rows]
+
+
+def live_names(batch_size):
+    """Имена файлов, на которые ссылаются посты и варианты, с миниатюрами.
+
+    Учитываются и архивные посты, хотя ссылок на их картинки
+    в StoredImage уже нет.
+    """
+    live = set()
+    for model in (Post, ArchivedPost):
+        for names in _chunks(model.objects.exclude(image=''), batch_size):
+            for name in names:
+                live.add(name)
+                live.update(thumbnails.names(ImageFile(name, storage)))
+    for names in _chunks(ImageVariant.objects.all(), batch_size):
+        live.update(names)
+    return live
+
+
+def _walk(path):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def orphans(live, grace):
+    """Пары (имя, размер) файлов вне ``live`` старше ``grace`` секунд.
+
+    Каталоги обходятся потоком через os.scandir. Свежие файлы
+    пропускаются: пост с только что загруженной картинкой мог еще
+    не попасть в базу.
+    """
+    root = storage.path('')
+    cutoff = time.time() - grace
+    upload_to = Post._meta.get_field('image').upload_to
+    for directory in (upload_to, thumbnail_settings.THUMBNAIL_PREFIX):
+        path = os.path.join(root, directory)
+        if not os.path.isdir(path):
+            continue
+        for entry in _walk(path):
+            name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            stat = entry.stat()
+            if name not in live and stat.st_mtime < cutoff:
+                yield name, stat.st_size
+
+
+def _still_orphaned(names, cutoff):
+    """Перепроверяет пачку перед удалением, отдает пары (имя, размер).
+
+    Пока шел обход, новый пост мог сослаться на найденный файл: при
+    загрузке того же содержимого хранилище не пишет файл заново,
+    а только обновляет его mtime. Такие файлы из пачки убираются.
+    """
+    sources = [
+        name for name in names
+        if not name.startswith(thumbnail_settings.THUMBNAIL_PREFIX)
+    ]
+    referenced = set()
+    for model in (Post, ArchivedPost):
+        referenced.update(model.objects.filter(
+            image__in=sources).values_list('image', flat=True))
+    orphaned = []
+    for name in names:
+        try:
+            stat = os.stat(storage.path(name))
+        except OSError:
+            continue
+        if name not in referenced and stat.st_mtime < cutoff:
+            orphaned.append((name, stat.st_size))
+    return orphaned
+
+
+def delete(names, cutoff):
+    """Удаляет файлы вместе с их записями в хранилище ключей sorl.
+
+    Удаляются только файлы старше ``cutoff`` без ссылок из постов.
+    Возвращает пары (имя, размер) действительно удаленных файлов.
+    """
+    deleted = _still_orphaned(names, cutoff)
+    keys = []
+    for name, size in deleted:
+        if name.startswith(thumbnail_settings.THUMBNAIL_PREFIX):
+            keys.append(add_prefix(ImageFile(name, default.storage).key))
+        else:
+            key = ImageFile(name, storage).key
+            keys += [add_prefix(key), add_prefix(key, 'thumbnails')]
+        storage.delete(name)
+    default.kvstore._delete_raw(*keys)
+    StoredImage.objects.filter(
+        name__in=[name for name, size in deleted], refs=0).delete()
+    return deleted
+
+
+def collect(batch_size, grace, dry_run=False):
+    """Удаляет неиспользуемые картинки и миниатюры пачками.
+
+    Возвращает число удаленных файлов и их размер в байтах. Файлы,
+    которые оставила повторная проверка пачки, не учитываются. При
+    ``dry_run`` ничего не удаляется, а итоги берутся по обходу.
+    """
+    cutoff = time.time() - grace
+    found = size = 0
+    batch = []
+    for name, file_size in orphans(live_names(batch_size), grace):
+        if dry_run:
+            found += 1
+            size += file_size
+            continue
+        batch.append(name)
+        if len(batch) >= batch_size:
+            deleted = delete(batch, cutoff)
+            found += len(deleted)
+            size += sum(file_size for name, file_size in deleted)
+            batch = []
+    if batch:
+        deleted = delete(batch, cutoff)
+        found += len(deleted)
+        size += sum(file_size for name, file_size in deleted)
+    return found, size
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:46
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def fill_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    images = (
+        Post.objects.exclude(image='').order_by().values('image')
+        .annotate(refs=Count('pk')).values_list('image', 'refs')
+    )
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, refs=refs) for name, refs in images)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_imagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='imagevariant',
+            name='image',
+            field=models.ImageField(storage=posts.storage.ContentAddressedStorage(), upload_to='posts/variants/', verbose_name='Картинка'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from posts import search
+
+    search.install(schema_editor.connection)
+    search.rebuild(schema_editor.connection)
+
+
+def remove_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from posts import search
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS {search.TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, remove_search),
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import constraints
 
+from .storage import content_storage
+
 User = get_user_model()
 
 
@@ -22,6 +24,11 @@ class Group(models.Model):
         help_text='Введите описание'
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('title',), name='group_title'),
+        )
+
     def __str__(self) -> str:
         return self.title
 
@@ -55,11 +62,33 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Крошечная копия картинки в виде data URI'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'), name='post_timeline'),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_timeline'),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_timeline'),
+            models.Index(fields=('image',), name='post_image'),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -88,6 +117,10 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', '-created'), name='comment_post_created'),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -95,17 +128,103 @@ class Comment(CreatedModel):
         return self.text[:15]
 
 
+class ArchivedPost(models.Model):
+    """Старый пост в холодном архиве. id совпадает с id бывшего поста.
+
+    Сюда посты переносит команда archive_posts, чтобы горячая таблица
+    posts_post оставалась небольшой. Архивные посты только читаются.
+    """
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания')
+    text = models.TextField(verbose_name='Текст')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True,
+        null=True,
+        verbose_name='Группа'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=content_storage,
+        blank=True
+    )
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    placeholder = models.TextField('Заглушка картинки', blank=True)
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='archived_post_author'),
+        )
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивного поста."""
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField(verbose_name='Текст')
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', '-created'),
+                name='archived_comment_post'),
+        )
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self):
+        return self.text[:15]
+
+
 class Follow(models.Model):
+    """Подписка. Может жить в отдельной базе FOLLOW_DATABASE.
+
+    Поэтому внешние ключи подписок и лент без ограничений в базе,
+    а их удаление вместе с пользователем и постом делают сигналы.
+    """
     user = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='follower',
         verbose_name='Пользователь',
         help_text='Укажите подписчика'
     )
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='following',
         verbose_name='Автор',
         help_text='Укажите автора'
@@ -116,8 +235,120 @@ class Follow(models.Model):
             constraints.UniqueConstraint(
                 fields=('user', 'author'), name='follow_unique'),
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user'),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     def __str__(self):
         return f'{self.user.username}, {self.author.username}'
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписчика: пост автора, на которого он подписан."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+        help_text='Укажите подписчика'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='feed_entries',
+        verbose_name='Пост',
+        help_text='Укажите пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Автор',
+        help_text='Укажите автора'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        help_text='Введите дату публикации'
+    )
+
+    class Meta:
+        constraints = (
+            constraints.UniqueConstraint(
+                fields=('user', 'post'), name='feed_entry_unique'),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'), name='feed_timeline'),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.user_id}, {self.post_id}'
+
+
+class ImageVariant(models.Model):
+    """Картинка поста нужной ширины в современном формате для srcset."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='variants',
+        verbose_name='Пост',
+        help_text='Укажите пост'
+    )
+    format = models.CharField(
+        max_length=8,
+        verbose_name='Формат',
+        help_text='Например, webp или avif'
+    )
+    width = models.PositiveSmallIntegerField(
+        verbose_name='Ширина',
+        help_text='Ширина в пикселях'
+    )
+    image = models.ImageField(
+        upload_to='posts/variants/',
+        storage=content_storage,
+        verbose_name='Картинка',
+    )
+
+    class Meta:
+        constraints = (
+            constraints.UniqueConstraint(
+                fields=('post', 'format', 'width'),
+                name='image_variant_unique'),
+        )
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+
+    def __str__(self):
+        return f'{self.post_id}, {self.format}, {self.width}'
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются.
+
+    Счетчик справочный: сборщик мусора решает по самим таблицам постов,
+    потому что архивные посты в refs не входят.
+    """
+    name = models.CharField(
+        primary_key=True,
+        max_length=255,
+        verbose_name='Файл',
+    )
+    refs = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ссылок',
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name}, {self.refs}'
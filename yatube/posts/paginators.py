@@ -0,0 +1,373 @@
+import base64
+import binascii
+import datetime as dt
+import hashlib
+import heapq
+import json
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import generation
+
+SQL_INT_MIN, SQL_INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа в непрозрачную строку для URL."""
+    data = json.dumps([
+        value.isoformat() if isinstance(value, dt.datetime) else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def _scalar(value):
+    """Значение, которое можно передать в запрос как параметр."""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return SQL_INT_MIN <= value <= SQL_INT_MAX
+    return isinstance(value, (str, float))
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор. Для испорченного курсора возвращает None.
+
+    Курсор приходит из URL, поэтому значения ключа проверяются:
+    вложенные списки и целые вне 64 бит отбрасываются вместе с курсором.
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or not all(map(_scalar, values)):
+        return None
+    return values
+
+
+def _keyed(stream, rows):
+    # Отдельная функция связывает stream сразу: генератор внутри
+    # выражения взял бы ключ последнего потока для всех строк.
+    return ((tuple(stream._key(row)), row) for row in rows)
+
+
+def _unique(items):
+    previous = None
+    for key, row in items:
+        if key != previous:
+            yield key, row
+        previous = key
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: без номера и без COUNT(*)."""
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор без COUNT(*) на каждый запрос и с окном номеров страниц.
+
+    Число записей берется из ``count``, если оно уже известно,
+    например из счетчика профиля. Иначе при заданном ``count_scope``
+    оно кешируется на PAGINATOR_COUNT_TIMEOUT секунд под поколением
+    области: запись в ней сбрасывает кеш, а таймаут ограничивает
+    устаревание. ``page_window`` — первая и последняя страницы
+    и PAGINATOR_WINDOW страниц вокруг текущей.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, count_scope=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_scope = count_scope
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        key = self._count_key()
+        if key is None:
+            return super().count
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def _count_key(self):
+        if self.count_scope is None:
+            return None
+        try:
+            sql = str(self.object_list.query)
+        except (AttributeError, EmptyResultSet):
+            return None
+        digest = hashlib.md5(sql.encode()).hexdigest()
+        return f'count:{generation(self.count_scope)}:{digest}'
+
+    @property
+    def last_window_page(self):
+        return self.num_pages
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=1):
+        """Номера страниц вокруг ``number`` с ELLIPSIS на месте пропусков."""
+        if on_each_side is None:
+            on_each_side = settings.PAGINATOR_WINDOW
+        last = self.last_window_page
+        pages = sorted(
+            {*range(1, on_ends + 1), *range(last - on_ends + 1, last + 1)}
+            | set(range(number - on_each_side, number + on_each_side + 1))
+        )
+        previous = 0
+        for page in pages:
+            if not 1 <= page <= last:
+                continue
+            if page - previous > 1:
+                yield self.ELLIPSIS
+            yield page
+            previous = page
+        if last < self.num_pages:
+            yield self.ELLIPSIS
+
+    def page(self, number):
+        page = super().page(number)
+        page.page_window = list(self.get_elided_page_range(page.number))
+        return page
+
+
+def estimated_count(model, using='default'):
+    """Число строк таблицы по статистике базы без COUNT(*) или None.
+
+    SQLite берет его из sqlite_stat1, которую заполняет ANALYZE,
+    PostgreSQL — из pg_class.reltuples.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Пагинатор админки для больших таблиц.
+
+    Для выборки без фильтров число строк берется из статистики базы,
+    если таблица не меньше PAGINATOR_ESTIMATE_FROM строк. Остальные
+    счетчики кешируются, как в CachedCountPaginator.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if (estimate is not None
+                    and estimate >= settings.PAGINATOR_ESTIMATE_FROM):
+                return estimate
+        return super().count
+
+
+class KeysetPaginator(CachedCountPaginator):
+    """Пагинатор по ключу (pub_date, id) в порядке убывания.
+
+    Первые ``depth`` страниц открываются по ``?page=``, дальше ссылки
+    строятся на курсорах ``?after=`` и ``?before=``: выборка идет
+    по индексу от ключа соседней записи, без OFFSET и COUNT(*).
+    ``transform`` превращает строки страницы в объекты для шаблона,
+    например записи ленты в посты; курсоры считаются до него.
+    """
+    keys = ('pub_date', 'id')
+
+    def __init__(self, object_list, per_page, keys=None, depth=None,
+                 transform=None, **kwargs):
+        if keys is not None:
+            self.keys = keys
+        self.depth = depth or settings.PAGINATOR_OFFSET_DEPTH
+        self.transform = transform or list
+        super().__init__(self._order(object_list), per_page, **kwargs)
+
+    @property
+    def last_window_page(self):
+        return min(self.num_pages, self.depth)
+
+    def validate_number(self, number):
+        """Номер страницы не дальше ``depth``.
+
+        Дальние страницы открываются только по курсору: иначе
+        ``?page=99999`` читал бы OFFSET через всю выборку, а слияние
+        потоков — все строки каждого потока до нужной страницы.
+        """
+        return min(super().validate_number(number), self.depth)
+
+    def cursor(self, row):
+        return encode_cursor(self._key(row))
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            # Закешированное число может отставать от таблицы:
+            # срез не должен обрезать уже появившиеся записи.
+            top = max(top, self.count)
+        rows = self._slice(bottom, top)
+        page = self._get_page(self.transform(self._unwrap(rows)), number, self)
+        page.page_window = list(self.get_elided_page_range(number))
+        if number >= self.depth and page.has_next() and rows:
+            page.next_cursor = self.cursor(rows[-1])
+        return page
+
+    def page_from_request(self, query):
+        for name, backwards in (('after', False), ('before', True)):
+            values = decode_cursor(query.get(name, ''))
+            if values is None or len(values) != len(self.keys):
+                continue
+            try:
+                return self.cursor_page(values, backwards)
+            except (ValidationError, ValueError, TypeError, OverflowError):
+                break
+        return self.get_page(query.get('page'))
+
+    def cursor_page(self, values, backwards=False):
+        rows = self._window(values, backwards, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return self.get_page(1)
+        if backwards:
+            rows.reverse()
+        return CursorPage(
+            self.transform(self._unwrap(rows)),
+            self,
+            next_cursor=(
+                self.cursor(rows[-1]) if has_more or backwards else None),
+            previous_cursor=(
+                self.cursor(rows[0]) if has_more or not backwards else None),
+        )
+
+    def _order(self, object_list):
+        return object_list.order_by(*(f'-{key}' for key in self.keys))
+
+    def _key(self, row):
+        return [getattr(row, key) for key in self.keys]
+
+    def _unwrap(self, rows):
+        return rows
+
+    def _slice(self, bottom, top):
+        return list(self.object_list[bottom:top])
+
+    def _seek(self, values, backwards):
+        lookup = 'gt' if backwards else 'lt'
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            condition |= Q(
+                **dict(zip(self.keys[:position], values)),
+                **{f'{key}__{lookup}': values[position]},
+            )
+        return condition
+
+    def _window(self, values, backwards, limit):
+        queryset = self.object_list.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        return list(queryset[:limit])
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """Пагинатор по нескольким потокам с общим порядком ключа.
+
+    ``object_list`` здесь — пары (queryset, keys): ключи потоков должны
+    быть сравнимы между собой, например (pub_date, id поста). Каждая
+    страница собирается k-way слиянием потоков через heapq.merge,
+    записи с одинаковым ключом склеиваются. Количество записей
+    считается суммой по потокам и может учитывать такие дубли.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        self.streams = [
+            KeysetPaginator(queryset, per_page, keys=keys)
+            for queryset, keys in object_list
+        ]
+        super().__init__(self.streams, per_page, **kwargs)
+
+    def _order(self, object_list):
+        return object_list
+
+    @cached_property
+    def count(self):
+        return sum(stream.count for stream in self.streams)
+
+    def _key(self, row):
+        return row[0]
+
+    def _unwrap(self, rows):
+        return [row for key, row in rows]
+
+    def _merge(self, streams, backwards, limit):
+        merged = heapq.merge(
+            *(_keyed(stream, rows) for stream, rows in streams),
+            key=itemgetter(0),
+            reverse=not backwards,
+        )
+        return list(islice(_unique(merged), limit))
+
+    def _slice(self, bottom, top):
+        merged = self._merge(
+            ((stream, stream.object_list[:top]) for stream in self.streams),
+            backwards=False,
+            limit=top,
+        )
+        return merged[bottom:]
+
+    def _window(self, values, backwards, limit):
+        return self._merge(
+            (
+                (stream, stream._window(values, backwards, limit))
+                for stream in self.streams
+            ),
+            backwards=backwards,
+            limit=limit,
+        )
+
+
+def paginate(request, object_list, paginator_class=KeysetPaginator,
+             **kwargs):
+    paginator = paginator_class(object_list, settings.AMOUNT_POSTS, **kwargs)
+    return paginator.page_from_request(request.GET)
@@ -0,0 +1,153 @@
+import re
+
+from django.db import connection, connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import decode_cursor, encode_cursor
+
+TABLE = 'posts_post_fts'
+MARK_START, MARK_END, ELLIPSIS = '\x01', '\x02', '…'
+
+# Внешняя таблица FTS5 хранит только индекс, текст берется из posts_post.
+# Пересборка таблицы posts_post в миграциях SQLite удаляет триггеры,
+# поэтому install вызывается еще и после каждого migrate.
+INSTALL_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+SEARCH_SQL = f"""
+    SELECT rowid, rank, snippet({TABLE}, 0, %s, %s, %s, 32)
+    FROM {TABLE}
+    WHERE {TABLE} MATCH %s {{seek}}
+    ORDER BY rank, rowid
+    LIMIT %s
+"""
+SEEK_SQL = 'AND (rank > %s OR (rank = %s AND rowid > %s))'
+
+
+def install(using=connection):
+    """Создает индекс и триггеры, если их нет. Только для SQLite."""
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(using=connection):
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def fts_query(text):
+    """Запрос FTS5 из пользовательского ввода.
+
+    Каждое слово берется в кавычки, так что операторы и спецсимволы
+    FTS5 из ввода не работают; последнее слово ищется по префиксу.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def _seek_values(after):
+    """Пара (rank, id) из курсора или None, если курсор не подходит."""
+    values = decode_cursor(after or '')
+    if values is None or len(values) != 2:
+        return None
+    rank, rowid = values
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool):
+        return None
+    if not isinstance(rowid, int) or isinstance(rowid, bool):
+        return None
+    return rank, rowid
+
+
+def search(text, after=None, limit=10):
+    """Посты, подходящие под ``text``, в порядке релевантности.
+
+    Страницы листаются по ключу (rank, id) через курсор ``after``.
+    Возвращает посты с ``post.snippet`` и курсор следующей страницы.
+    """
+    query = fts_query(text)
+    using = router.db_for_read(Post)
+    if query is None or connections[using].vendor != 'sqlite':
+        return [], None
+    seek, seek_params = '', []
+    cursor_values = _seek_values(after)
+    if cursor_values is not None:
+        rank, rowid = cursor_values
+        seek, seek_params = SEEK_SQL, [rank, rank, rowid]
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            SEARCH_SQL.format(seek=seek),
+            [MARK_START, MARK_END, ELLIPSIS, query,
+             *seek_params, limit + 1],
+        )
+        rows = cursor.fetchall()
+    page, has_next = rows[:limit], len(rows) > limit
+    posts = Post.objects.using(using).select_related('author', 'group')
+    posts = posts.in_bulk([post_id for post_id, rank, snippet in page])
+    found = []
+    for post_id, rank, snippet in page:
+        if post_id in posts:
+            posts[post_id].snippet = _highlight(snippet)
+            found.append(posts[post_id])
+    next_cursor = None
+    if has_next:
+        post_id, rank, snippet = page[-1]
+        next_cursor = encode_cursor([rank, post_id])
+    return found, next_cursor
+
+
+def matching_ids(text):
+    """Подзапрос id постов для фильтра ``id__in`` или None."""
+    query = fts_query(text)
+    if query is None:
+        return None
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [query])
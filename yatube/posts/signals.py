@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+
+from . import cache, counters, feeds, search
+from .models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_profile(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_profile(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_profile(instance.author_id, 'followers_count', 1)
+        counters.change_profile(instance.user_id, 'following_count', 1)
+        feeds.switch_delivery(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_profile(instance.author_id, 'followers_count', -1)
+    counters.change_profile(instance.user_id, 'following_count', -1)
+    feeds.switch_delivery(instance.author_id, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._initial_image = getattr(image, 'name', image) or None
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, raw=False, **kwargs):
+    image = instance.image.name or None
+    initial = None if created else instance._initial_image
+    if not raw and image != initial:
+        if image:
+            counters.change_refs(image, 1)
+        if initial:
+            counters.change_refs(initial, -1)
+    instance._initial_image = image
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_image(sender, instance, **kwargs):
+    if instance.image.name:
+        counters.change_refs(instance.image.name, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_card_version(sender, instance, **kwargs):
+    cache.bump_version(instance.id)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    group_ids = {instance.group_id, instance._initial_group_id} - {None}
+    slugs = Group.objects.filter(id__in=group_ids).values_list(
+        'slug', flat=True)
+    cache.bump_generation(
+        'index',
+        cache.profile_scope(instance.author.username),
+        *(cache.group_scope(slug) for slug in slugs),
+    )
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_admin_counts(sender, **kwargs):
+    cache.bump_generation(cache.admin_scope(sender))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    cache.bump_generation(cache.group_scope(instance.slug))
+
+
+@receiver(post_save, sender=Post)
+def push_to_feeds(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feeds.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feeds.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_page(sender, instance, **kwargs):
+    cache.bump_generation(cache.profile_scope(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(sender, instance, **kwargs):
+    feeds.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    if sender.name == 'posts' and router.allow_migrate_model(using, Post):
+        search.install(connections[using])
+
+
+@receiver(pre_delete, sender=User)
+def delete_follow_graph(sender, instance, **kwargs):
+    Follow.objects.filter(user_id=instance.id).delete()
+    Follow.objects.filter(author_id=instance.id).delete()
+    FeedEntry.objects.filter(user_id=instance.id).delete()
+
+
+@receiver(post_delete, sender=Post)
+def delete_feed_entries(sender, instance, **kwargs):
+    FeedEntry.objects.filter(post_id=instance.id).delete()
@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Файл кладется в подкаталоги каталога upload_to по первым байтам
+    хеша: posts/ab/cd/abcd….jpg при MEDIA_SHARD_DEPTH = 2, чтобы
+    в одном каталоге не копились миллионы файлов. Одинаковые файлы
+    записываются один раз: если файл с таким хешем уже есть, save
+    только обновляет его mtime и возвращает имя. Поэтому миниатюры
+    sorl, привязанные к имени исходника, общие для всех его копий.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        shards = (
+            digest[level * 2:level * 2 + 2]
+            for level in range(settings.MEDIA_SHARD_DEPTH)
+        )
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), *shards, digest + extension)
+
+    @staticmethod
+    def sharded_pattern():
+        """Регулярное выражение для имен, уже разложенных по шардам."""
+        shards = '[0-9a-f]{2}/' * settings.MEDIA_SHARD_DEPTH
+        return rf'(^|/){shards}[0-9a-f]{{64}}\.[^/]*$'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Свежий mtime защищает файл от сборщика мусора, который
+            # мог счесть его ненужным до этой загрузки.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+content_storage = ContentAddressedStorage()
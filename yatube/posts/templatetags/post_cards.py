@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from .. import thumbnails
+from ..cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    cards = render_cards(posts, prepare=thumbnails.resolve)
+    return [mark_safe(card) for card in cards]
+
+
+@register.simple_tag
+def ready_thumbnail(image, name):
+    return thumbnails.ready(image, name)
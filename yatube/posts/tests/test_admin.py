@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class ChangelistQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        for index in range(number):
+            author = User.objects.create_user(
+                username=f'user{User.objects.count()}')
+            post = Post.objects.create(
+                text=f'Пост {index}', author=author, group=self.group)
+            Comment.objects.create(post=post, author=author, text='Ок')
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        """Число запросов списка не зависит от числа строк"""
+        urls = [
+            reverse(f'admin:posts_{model}_changelist')
+            for model in ('post', 'comment', 'follow')
+        ]
+        self.add_rows(1)
+        before = {url: self.count_queries(url) for url in urls}
+        self.add_rows(3)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+    def test_changelist_count_is_cached_until_write(self):
+        """COUNT(*) списка кешируется до следующей записи"""
+        self.add_rows(2)
+        url = reverse('admin:posts_comment_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.add_rows(1)
+        self.assertEqual(
+            self.client.get(url).context['cl'].result_count, 3)
+
+    @override_settings(PAGINATOR_ESTIMATE_FROM=2)
+    def test_large_table_count_is_estimated(self):
+        """Для большой таблицы без фильтров число строк берется из ANALYZE"""
+        self.add_rows(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_rows(1)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 3)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 10)
+        self.assertEqual(filtered.count, 4)
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        for username in ('anna', 'andrew', 'boris'):
+            User.objects.create_user(username=username)
+        Group.objects.create(title='Котики', slug='cats')
+        Group.objects.create(title='Собаки', slug='dogs')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def complete(self, model, term):
+        response = self.client.get(
+            reverse(f'admin:{model}_autocomplete'), {'term': term})
+        return [result['text'] for result in response.json()['results']]
+
+    def test_autocomplete_matches_prefix(self):
+        """Автодополнение ищет по началу имени и названия"""
+        self.assertCountEqual(
+            self.complete('auth_user', 'an'), ['anna', 'andrew'])
+        self.assertEqual(self.complete('auth_user', 'ris'), [])
+        self.assertEqual(self.complete('posts_group', 'Кот'), ['Котики'])
+        self.assertEqual(self.complete('posts_group', 'dog'), ['Собаки'])
+
+    def test_post_form_uses_autocomplete(self):
+        """Форма поста не выводит всех пользователей и группы"""
+        response = self.client.get(reverse('admin:posts_post_add'))
+        self.assertNotContains(response, 'boris')
+        self.assertNotContains(response, 'Собаки')
+        self.assertContains(response, 'admin-autocomplete')
@@ -0,0 +1,111 @@
+import datetime as dt
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from users.models import Profile
+
+from .. import counters
+from ..models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                      Follow, Group, Post)
+
+User = get_user_model()
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.follower = User.objects.create_user(username='follower')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group)
+            for number in range(5)
+        ]
+        self.old_date = timezone.now() - dt.timedelta(days=400)
+        self.old_ids = [post.id for post in self.posts[:3]]
+        for days, post_id in enumerate(self.old_ids):
+            Post.objects.filter(id=post_id).update(
+                pub_date=self.old_date + dt.timedelta(days=days))
+        self.comment = Comment.objects.create(
+            post=self.posts[0], author=self.follower, text='Комментарий')
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def archive(self):
+        out = StringIO()
+        call_command('archive_posts', '--batch-size=2', stdout=out)
+        return out.getvalue()
+
+    def test_old_posts_move_to_archive(self):
+        """Старые посты с комментариями переносятся в архив пачками"""
+        output = self.archive()
+        self.assertIn('Перенесено постов: 2', output)
+        self.assertIn('Перенесено постов: 3, комментариев: 1', output)
+        self.assertFalse(Post.objects.filter(id__in=self.old_ids).exists())
+        self.assertEqual(Post.objects.count(), 2)
+        archived = ArchivedPost.objects.get(id=self.old_ids[0])
+        self.assertEqual(archived.pub_date, self.old_date)
+        self.assertEqual(archived.group, self.group)
+        self.assertEqual(archived.comments_count, 1)
+        self.assertEqual(
+            list(archived.comments.values_list('id', 'text')),
+            [(self.comment.id, 'Комментарий')])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(
+            FeedEntry.objects.filter(post_id__in=self.old_ids).exists())
+        profile = Profile.objects.get(user=self.author)
+        self.assertEqual(profile.posts_count, 2)
+        self.assertEqual(profile.archived_posts_count, 3)
+        self.assertEqual(profile.all_posts_count, 5)
+        self.assertEqual(self.archive(), 'Готово. Перенесено постов: 0, '
+                                         'комментариев: 0\n')
+
+    def test_counters_stay_consistent(self):
+        """Сверка счетчиков после переноса ничего не правит"""
+        self.archive()
+        self.assertFalse(any(counters.reconcile().values()))
+
+    def test_post_detail_falls_back_to_archive(self):
+        """Страница архивного поста открывается без формы комментария"""
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.old_ids[0],)))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['count_posts'], 5)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий'])
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=(self.old_ids[0],)))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.posts[-1].id,)))
+        self.assertFalse(response.context['archived'])
+
+    def test_profile_merges_hot_and_archived_posts(self):
+        """Профиль показывает горячие и архивные посты в одном порядке"""
+        expected = list(
+            Post.objects.filter(author=self.author).values_list(
+                'id', flat=True))
+        self.archive()
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,)))
+        page_obj = response.context['page_obj']
+        self.assertEqual([post.id for post in page_obj], expected)
+        self.assertEqual(page_obj.paginator.count, 5)
+        self.assertIsInstance(page_obj[-1], ArchivedPost)
+
+    def test_deleting_author_removes_archive(self):
+        """Удаление автора удаляет и его архив"""
+        self.archive()
+        self.author.delete()
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
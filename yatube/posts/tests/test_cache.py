@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cache import render_cards
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_cards_are_rendered_from_cache(self):
+        """Повторная отрисовка карточки не обращается к шаблону"""
+        first = render_cards([self.post])
+        self.post.text = 'Текст без сохранения'
+        self.assertEqual(render_cards([self.post]), first)
+
+    def test_edit_invalidates_card(self):
+        """Редактирование поста сбрасывает его карточку"""
+        url = reverse('posts:profile', args=[self.user.username])
+        self.author_client.get(url)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            {'text': 'Новый текст'},
+        )
+        self.assertContains(self.author_client.get(url), 'Новый текст')
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовый тайтл',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        )
+
+    def test_pages_are_cached(self):
+        """Повторный запрос страницы не обращается к базе"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    self.guest_client.get(url)
+
+    def test_new_post_invalidates_pages(self):
+        """Новый пост сразу появляется на всех затронутых страницах"""
+        for url in self.urls:
+            self.guest_client.get(url)
+            self.guest_client.get(url + '?page=2')
+        Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост')
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Свежий пост')
+
+    def test_moving_post_invalidates_previous_group(self):
+        """Перенос поста в другую группу сбрасывает прежнюю группу"""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Переезжающий пост')
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertContains(self.guest_client.get(url), 'Переезжающий пост')
+        post = Post.objects.get(id=post.id)
+        post.group = None
+        post.save()
+        self.assertNotContains(
+            self.guest_client.get(url), 'Переезжающий пост')
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from users.models import Profile
+
+from .. import counters
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании и удалении объектов"""
+        post = Post.objects.create(author=self.author, text='Тестовый текст')
+        comment = Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.follower).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(self.follower).following_count, 0)
+        post.delete()
+        self.assertEqual(self.profile(self.author).posts_count, 0)
+
+    def test_counters_never_go_negative(self):
+        """Счетчик не уходит ниже нуля при рассинхронизации"""
+        post = Post.objects.create(author=self.author, text='Тестовый текст')
+        Profile.objects.filter(user=self.author).update(posts_count=0)
+        post.delete()
+        self.assertEqual(self.profile(self.author).posts_count, 0)
+
+    def test_reconcile_counters_command(self):
+        """Команда исправляет разошедшиеся счетчики"""
+        post = Post.objects.create(author=self.author, text='Тестовый текст')
+        Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий')
+        Profile.objects.filter(user=self.author).delete()
+        Post.objects.update(comments_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+
+    def test_reconcile_across_databases(self):
+        """Сверка без подзапроса для таблицы из другой базы"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Profile.objects.update(followers_count=7)
+        fixed = counters._reconcile_across(
+            Profile, 'followers_count', Follow.objects.all(), 'author')
+        self.assertEqual(fixed, 2)
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.follower).followers_count, 0)
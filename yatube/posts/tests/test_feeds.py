@@ -0,0 +1,185 @@
+import datetime as dt
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FeedEntryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже написанные посты автора"""
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=self.old_post).exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.old_post])
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.follower).exists())
+
+    def test_rebuild_feeds_command(self):
+        """Команда пересобирает ленты и удаляет устаревшие записи"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=self.old_post).exists())
+        FeedEntry.objects.update(
+            pub_date=timezone.now() - dt.timedelta(days=30))
+        call_command(
+            'rebuild_feeds', '--trim-only', '--retention-days=7',
+            stdout=StringIO())
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_deletes_clean_follow_graph(self):
+        """Удаление поста и пользователя чистит подписки и ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        post.delete()
+        self.assertFalse(FeedEntry.objects.filter(post_id=post.id).exists())
+        User.objects.filter(id=self.author.id).delete()
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_follow_index_does_not_join_across_databases(self):
+        """Лента не соединяет таблицы подписок с таблицами основной базы"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        graph_tables = [
+            model._meta.db_table for model in (Follow, FeedEntry)]
+        with CaptureQueriesContext(connection) as queries:
+            self.follower_client.get(reverse('posts:follow_index'))
+        for query in queries:
+            sql = query['sql']
+            if any(table in sql for table in graph_tables):
+                with self.subTest(sql=sql):
+                    tables = set(re.findall(r'"(\w+)"\."', sql))
+                    self.assertLessEqual(tables, set(graph_tables))
+
+
+@override_settings(FEED_PULL_THRESHOLD=1)
+class HybridFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.popular = User.objects.create_user(username='popular')
+        cls.author = User.objects.create_user(username='author')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=cls.popular)
+        Follow.objects.create(user=cls.follower, author=cls.popular)
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.posts = [
+            Post.objects.create(author=author, text=f'Пост {number}')
+            for number, author in enumerate(
+                (cls.popular, cls.author, cls.popular, cls.author))
+        ]
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_popular_authors_are_not_pushed(self):
+        """Посты авторов выше порога не раскладываются по лентам"""
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.popular).exists())
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.follower).count(), 2)
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает оба потока в порядке публикации"""
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[::-1])
+
+    @override_settings(AMOUNT_POSTS=1, PAGINATOR_OFFSET_DEPTH=1)
+    def test_feed_cursor_walks_both_streams(self):
+        """Курсор листает слитую ленту без пропусков"""
+        url = reverse('posts:follow_index')
+        page_obj = self.follower_client.get(url).context['page_obj']
+        seen = list(page_obj)
+        while page_obj.has_next():
+            page_obj = self.follower_client.get(
+                url, {'after': page_obj.next_cursor}).context['page_obj']
+            seen.extend(page_obj)
+        self.assertEqual(seen, self.posts[::-1])
+
+    @override_settings(AMOUNT_POSTS=2, PAGINATOR_OFFSET_DEPTH=1)
+    def test_feed_pages_use_post_keys_of_each_stream(self):
+        """Записи ленты сортируются по id поста, а не по своему id"""
+        pub_date = timezone.now()
+        Post.objects.update(pub_date=pub_date)
+        FeedEntry.objects.update(pub_date=pub_date)
+        expected = sorted(self.posts, key=lambda post: post.id, reverse=True)
+        url = reverse('posts:follow_index')
+        pages = [self.follower_client.get(url).context['page_obj']]
+        while pages[-1].has_next():
+            pages.append(self.follower_client.get(
+                url, {'after': pages[-1].next_cursor}).context['page_obj'])
+        self.assertEqual(
+            [post for page in pages for post in page], expected)
+        backwards = [list(pages[-1])]
+        page_obj = pages[-1]
+        while page_obj.has_previous():
+            page_obj = self.follower_client.get(
+                url, {'before': page_obj.previous_cursor}
+            ).context['page_obj']
+            backwards.insert(0, list(page_obj))
+        self.assertEqual(
+            [post for page in backwards for post in page], expected)
+
+    def test_author_below_threshold_is_pushed_again(self):
+        """После отписки ниже порога старые посты автора остаются в ленте"""
+        Follow.objects.filter(author=self.popular).exclude(
+            user=self.follower).delete()
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[::-1])
+        self.assertEqual(
+            FeedEntry.objects.filter(author=self.popular).count(), 2)
+
+    def test_author_above_threshold_drops_feed_entries(self):
+        """При переходе порога вверх записи лент автора удаляются"""
+        fan = User.objects.create_user(username='another_fan')
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.author).exists())
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[::-1])
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
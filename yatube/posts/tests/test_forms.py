@@ -1,16 +1,27 @@
 import shutil
 import tempfile
+from io import BytesIO
 
+from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.forms import CommentForm, PostForm
 
-from ..models import Comment, Group, Post
+from ..models import Comment, Group, Post, StoredImage
+from ..storage import content_storage
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHES = {
+    **settings.CACHES,
+    'thumbnails': {
+        **settings.CACHES['thumbnails'], 'LOCATION': TEMP_CACHE_ROOT},
+}
 
 User = get_user_model()
 
@@ -78,7 +89,7 @@ class PostFormTests(TestCase):
         )
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, CACHES=TEMP_CACHES)
 class PostFormImageTest(TestCase):
     @classmethod
     def setUpClass(cls) -> None:
@@ -94,6 +105,7 @@ class PostFormImageTest(TestCase):
     def tearDownClass(cls) -> None:
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
 
     def setUp(self):
         self.author_client = Client()
@@ -132,10 +144,87 @@ class PostFormImageTest(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text='Тестовый текст',
-                image='posts/small.gif'
+                image=content_storage.hashed_name(
+                    'posts/small.gif', ContentFile(small_gif))
             ).exists()
         )
 
+    def test_same_image_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом со счетчиком ссылок"""
+        content = b'GIF89a\x01\x00\x01\x00\x00\x00\x00;'
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=self.user,
+                image=SimpleUploadedFile(f'copy{number}.gif', content),
+            )
+            for number in range(2)
+        ]
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        image = StoredImage.objects.get(name=posts[0].image.name)
+        self.assertEqual(image.refs, 2)
+        posts[0].delete()
+        image.refresh_from_db()
+        self.assertEqual(image.refs, 1)
+
+    def test_rejected_image_uploads(self):
+        """Картинка проверяется по заголовку и размеру при загрузке"""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cases = {
+            'Загрузите картинку.': (
+                {}, b'not an image'),
+            'Файл больше 0 МБ.': (
+                {'IMAGE_UPLOAD_MAX_BYTES': 10}, small_gif),
+            'Слишком большое разрешение картинки.': (
+                {'IMAGE_UPLOAD_MAX_PIXELS': 1}, small_gif),
+            'Формат картинки не поддерживается.': (
+                {'IMAGE_UPLOAD_FORMATS': ('PNG',)}, small_gif),
+        }
+        posts_count = Post.objects.count()
+        for error, (limits, content) in cases.items():
+            with self.subTest(error=error), override_settings(**limits):
+                response = self.author_client.post(
+                    reverse('posts:post_create'),
+                    data={
+                        'text': 'Тестовый текст',
+                        'image': SimpleUploadedFile('small.gif', content),
+                    },
+                )
+                self.assertFormError(response, 'form', 'image', error)
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    def test_rejection_message_does_not_leak(self):
+        """Ошибка отклоненной загрузки не достается следующей форме"""
+        # Заголовок PNG проходит проверку при загрузке, а испорченный
+        # блок IDAT отклоняет уже сама форма своим сообщением.
+        buffer = BytesIO()
+        Image.new('RGB', (2, 1)).save(buffer, 'PNG')
+        broken_png = bytearray(buffer.getvalue())
+        broken_png[broken_png.index(b'IDAT') + 6] ^= 0xFF
+        uploads = (
+            ({'IMAGE_UPLOAD_MAX_BYTES': 10}, 'Файл больше 0 МБ.'),
+            ({}, str(forms.ImageField.default_error_messages[
+                'invalid_image'])),
+        )
+        for limits, error in uploads:
+            with self.subTest(error=error), override_settings(**limits):
+                response = self.author_client.post(
+                    reverse('posts:post_create'),
+                    data={
+                        'text': 'Тестовый текст',
+                        'image': SimpleUploadedFile(
+                            'broken.png', bytes(broken_png)),
+                    },
+                )
+                self.assertFormError(response, 'form', 'image', error)
+
 
 class CommentFormTests(TestCase):
     @classmethod
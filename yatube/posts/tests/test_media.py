@@ -0,0 +1,168 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import media, thumbnails
+from ..models import ArchivedPost, Post, StoredImage
+from ..storage import content_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHES = {
+    **settings.CACHES,
+    'thumbnails': {
+        **settings.CACHES['thumbnails'], 'LOCATION': TEMP_CACHE_ROOT},
+}
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, CACHES=TEMP_CACHES)
+class ShardMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+
+    def test_shard_media_moves_flat_files(self):
+        """Команда раскладывает старые картинки по шардам"""
+        legacy = 'posts/legacy.gif'
+        content_storage._save(legacy, ContentFile(SMALL_GIF))
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.user, image=legacy)
+            for number in range(2)
+        ]
+        call_command('shard_media', '--batch-size=1', stdout=StringIO())
+        sharded = content_storage.hashed_name(
+            'posts/legacy.gif', ContentFile(SMALL_GIF))
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.image.name, sharded)
+        self.assertTrue(content_storage.exists(sharded))
+        self.assertFalse(content_storage.exists(legacy))
+        self.assertEqual(StoredImage.objects.get(name=sharded).refs, 2)
+        self.assertFalse(StoredImage.objects.filter(name=legacy).exists())
+        self.assertIsNotNone(thumbnails.ready(posts[0].image, 'card'))
+        out = StringIO()
+        call_command('shard_media', stdout=out)
+        self.assertIn('Перенесено постов: 0', out.getvalue())
+
+    def test_shard_media_relinks_archived_posts(self):
+        """Архивные посты с тем же файлом тоже переписываются"""
+        legacy = 'posts/archived.gif'
+        content_storage._save(legacy, ContentFile(SMALL_GIF))
+        post = Post.objects.create(
+            text='Горячий пост', author=self.user, image=legacy)
+        archived = ArchivedPost.objects.create(
+            id=post.id + 100, created=post.created, pub_date=post.pub_date,
+            text='Архивный пост', author=self.user, image=legacy)
+        other = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+        content_storage._save('posts/lonely.gif', ContentFile(other))
+        lonely = ArchivedPost.objects.create(
+            id=post.id + 101, created=post.created, pub_date=post.pub_date,
+            text='Только в архиве', author=self.user,
+            image='posts/lonely.gif')
+        call_command('shard_media', stdout=StringIO())
+        for row in (post, archived, lonely):
+            row.refresh_from_db()
+            self.assertRegex(row.image.name, content_storage.sharded_pattern())
+            self.assertTrue(content_storage.exists(row.image.name))
+        self.assertEqual(post.image.name, archived.image.name)
+        self.assertFalse(content_storage.exists(legacy))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, CACHES=TEMP_CACHES)
+class GcMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        caches['thumbnails'].clear()
+
+    def create_post(self, name, content):
+        post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.user,
+            image=SimpleUploadedFile(name, content),
+        )
+        thumbnails.generate(post.id)
+        return post
+
+    def test_gc_media_removes_orphans(self):
+        """Команда удаляет картинки и миниатюры удаленных постов"""
+        live = self.create_post('live.gif', SMALL_GIF)
+        dead = self.create_post('dead.gif', SMALL_GIF.replace(
+            b'\xFF\xFF\xFF', b'\x00\xFF\x00'))
+        live_files, dead_files = (
+            [post.image.name, *thumbnails.names(post.image),
+             *post.variants.values_list('image', flat=True)]
+            for post in (live, dead)
+        )
+        dead.delete()
+        size = sum(content_storage.size(name) for name in dead_files)
+        out = StringIO()
+        call_command(
+            'gc_media', '--dry-run', '--grace-minutes=-1', stdout=out)
+        self.assertIn(f'освободится байт: {size}', out.getvalue())
+        self.assertTrue(all(map(content_storage.exists, dead_files)))
+        out = StringIO()
+        call_command('gc_media', '--grace-minutes=-1', stdout=out)
+        self.assertIn(
+            f'Удалено файлов: {len(dead_files)}, освобождено байт: {size}',
+            out.getvalue())
+        self.assertFalse(any(map(content_storage.exists, dead_files)))
+        self.assertTrue(all(map(content_storage.exists, live_files)))
+        self.assertIsNone(thumbnails.ready(dead.image, 'card'))
+        self.assertIsNotNone(thumbnails.ready(live.image, 'card'))
+
+    def test_gc_media_keeps_file_reused_during_collection(self):
+        """Файл, на который сослался новый пост во время сборки, остается"""
+        dead = self.create_post('dead.gif', SMALL_GIF)
+        name = dead.image.name
+        dead.delete()
+        orphaned = [
+            found for found, file_size in media.orphans(
+                media.live_names(10), grace=-60)
+        ]
+        self.assertIn(name, orphaned)
+        Post.objects.create(
+            text='Тот же файл', author=self.user,
+            image=SimpleUploadedFile('again.gif', SMALL_GIF))
+        deleted = media.delete(orphaned, cutoff=time.time() + 60)
+        self.assertTrue(content_storage.exists(name))
+        self.assertNotIn(name, [found for found, file_size in deleted])
+        self.assertEqual(
+            {found for found, file_size in deleted}, set(orphaned) - {name})
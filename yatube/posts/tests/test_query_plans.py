@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, search, variants
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      Post)
+
+User = get_user_model()
+
+
+class QueryPlanTest(TestCase):
+    """Запросы страниц идут по индексам.
+
+    Каждый SELECT страницы прогоняется через EXPLAIN QUERY PLAN.
+    Полный просмотр таблицы (SCAN без индекса) и сортировка
+    во временном B-дереве считаются ошибкой. Исключение — сортировка
+    по релевантности в полнотекстовом поиске: она идет только по
+    найденным строкам.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group)
+        Post.objects.create(text='Второй пост', author=cls.author)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        cls.archived = ArchivedPost.objects.create(
+            id=cls.post.id + 100, created=cls.post.created,
+            pub_date=cls.post.pub_date, text='Архивный пост',
+            author=cls.author, group=cls.group)
+        ArchivedComment.objects.create(
+            id=1, created=cls.post.created, post=cls.archived,
+            author=cls.reader, text='Комментарий')
+        counters.change_profile(cls.author.id, 'archived_posts_count', 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def bad_steps(self, sql):
+        ranked = search.TABLE in sql
+        return [
+            step for step in self.plan(sql)
+            if ('TEMP B-TREE' in step and not ranked)
+            or (step.startswith('SCAN ') and 'USING' not in step
+                and 'VIRTUAL TABLE' not in step)
+        ]
+
+    def test_views_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:post_detail', args=[self.archived.id]),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=пост',
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    self.assertEqual(self.bad_steps(sql), [])
+
+    def test_image_sharing_uses_index(self):
+        """Поиск поста с той же картинкой идет по индексу"""
+        self.post.image = 'posts/shared.gif'
+        with CaptureQueriesContext(connection) as queries:
+            variants._share(self.post)
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertEqual(self.bad_steps(query['sql']), [])
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import encode_cursor
+
+User = get_user_model()
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Котики и <b>котики</b> и снова котики')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Котик номер {number}')
+            for number in range(3)
+        ]
+        Post.objects.create(author=cls.user, text='Собаки')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_ranks_and_highlights(self):
+        """Поиск находит посты по префиксу и подсвечивает совпадения"""
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        posts = response.context['posts']
+        self.assertEqual(posts[0], self.best)
+        self.assertCountEqual(posts[1:], self.posts)
+        self.assertIn('<mark>котики</mark>', posts[0].snippet)
+        self.assertIn('&lt;b&gt;', posts[0].snippet)
+        self.assertIsNone(response.context['next_cursor'])
+
+    @override_settings(AMOUNT_POSTS=2)
+    def test_search_pages_by_cursor(self):
+        """Следующая страница поиска открывается по курсору"""
+        url = reverse('posts:search')
+        first = self.client.get(url, {'q': 'кот'}).context
+        second = self.client.get(
+            url, {'q': 'кот', 'after': first['next_cursor']}).context
+        self.assertEqual(len(first['posts']), 2)
+        self.assertEqual(len(second['posts']), 2)
+        self.assertIsNone(second['next_cursor'])
+        self.assertCountEqual(
+            first['posts'] + second['posts'], [self.best, *self.posts])
+
+    def test_broken_cursor_is_ignored(self):
+        """Курсор с неподходящими значениями открывает первую страницу"""
+        for values in ([[1], 2], [1.0, 2 ** 70], ['rank', 1], [1.0, 1.5]):
+            with self.subTest(values=values):
+                response = self.client.get(
+                    reverse('posts:search'),
+                    {'q': 'кот', 'after': encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['posts'][0], self.best)
+
+    def test_search_follows_edits(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        url = reverse('posts:search')
+        edited, deleted = Post.objects.filter(
+            id__in=[post.id for post in self.posts[:2]])
+        edited.text = 'Лошадь'
+        edited.save()
+        deleted.delete()
+        self.assertEqual(
+            self.client.get(url, {'q': 'лошадь'}).context['posts'], [edited])
+        self.assertEqual(
+            len(self.client.get(url, {'q': 'котик'}).context['posts']), 2)
+
+    def test_search_ignores_operators(self):
+        """Операторы FTS5 во вводе не ломают запрос"""
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'собаки OR "NEAR('})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts'], [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по полнотекстовому индексу"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'})
+        self.assertEqual(response.context['cl'].result_count, 1)
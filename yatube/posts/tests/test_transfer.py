@@ -0,0 +1,79 @@
+import datetime as dt
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from users.models import Profile
+
+from ..models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.path = os.path.join(cls.directory, 'dump.jsonl')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.follower = User.objects.create_user(username='follower')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.follower, text='Комментарий')
+        self.old_date = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(id=self.posts[0].id).update(
+            pub_date=self.old_date)
+
+    def test_export_import_round_trip(self):
+        """Данные переносятся через JSONL без потерь"""
+        out = StringIO()
+        call_command('export_jsonl', self.path, '--batch-size=2', stdout=out)
+        self.assertIn('posts.post: выгружено строк 5', out.getvalue())
+        expected = {
+            model: list(model.objects.order_by('pk').values())
+            for model in (User, Group, Post, Comment, Follow)
+        }
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        FeedEntry.objects.all().delete()
+        Profile.objects.all().delete()
+        call_command('import_jsonl', self.path, '--batch-size=2',
+                     stdout=StringIO())
+        for model, rows in expected.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    list(model.objects.order_by('pk').values()), rows)
+        self.assertEqual(
+            Post.objects.get(id=self.posts[0].id).pub_date, self.old_date)
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 5)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.follower).count(), 5)
+
+    def test_import_skips_existing_rows(self):
+        """Повторная загрузка не дублирует строки"""
+        call_command('export_jsonl', self.path, stdout=StringIO())
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        post = Post.objects.create(text='Новый', author=self.author)
+        self.assertGreater(post.id, self.posts[-1].id)
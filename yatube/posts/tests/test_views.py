@@ -1,17 +1,32 @@
+import re
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from .. import counters, thumbnails, variants
 from ..models import Comment, Follow, Group, Post
+from ..paginators import encode_cursor
+from ..storage import content_storage
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHES = {
+    **settings.CACHES,
+    'thumbnails': {
+        **settings.CACHES['thumbnails'], 'LOCATION': TEMP_CACHE_ROOT},
+}
 
 User = get_user_model()
 
@@ -108,6 +123,98 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']), 3)
 
 
+@override_settings(PAGINATOR_OFFSET_DEPTH=1)
+class KeysetPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый текст {numbers}')
+            for numbers in range(1, 14)
+        )
+        counters.reconcile()
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_pages_follow_offset_pages(self):
+        """После заданной глубины страницы листаются по курсору"""
+        url = reverse('posts:profile', args=[self.user.username])
+        first_page = self.guest_client.get(url).context['page_obj']
+        self.assertEqual(first_page.number, 1)
+        self.assertTrue(first_page.next_cursor)
+        second_page = self.guest_client.get(
+            url, {'after': first_page.next_cursor}).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            [post.id for post in list(first_page) + list(second_page)],
+            list(Post.objects.order_by('-pub_date', '-id')
+                 .values_list('id', flat=True)),
+        )
+        back_page = self.guest_client.get(
+            url, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_deep_page_number_stops_at_offset_depth(self):
+        """Номер страницы дальше глубины открывает последнюю по номеру"""
+        url = reverse('posts:profile', args=[self.user.username])
+        with CaptureQueriesContext(connection) as queries:
+            page_obj = self.guest_client.get(
+                url, {'page': 99999}).context['page_obj']
+        self.assertEqual(page_obj.number, 1)
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.next_cursor)
+        limits = [
+            int(limit) for query in queries
+            for limit in re.findall(r'LIMIT (\d+)', query['sql'])
+        ]
+        self.assertLessEqual(max(limits), 10)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_out_of_range_cursor_falls_back_to_first_page(self):
+        """Курсор с неподходящими значениями ключа не ломает страницу"""
+        for values in (['2020-01-01T00:00:00', 2 ** 70],
+                       [['2020-01-01T00:00:00'], 1],
+                       [True, 1]):
+            with self.subTest(values=values):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'after': encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+    @override_settings(
+        AMOUNT_POSTS=1, PAGINATOR_OFFSET_DEPTH=10, PAGINATOR_WINDOW=1)
+    def test_page_window_is_elided(self):
+        """Номера страниц выводятся окном с пропусками"""
+        response = self.guest_client.get(reverse('posts:index'), {'page': 5})
+        self.assertEqual(
+            response.context['page_obj'].page_window,
+            [1, '…', 4, 5, 6, '…', 10, '…'],
+        )
+        self.assertNotContains(response, '?page=7"')
+
+    def test_count_is_cached_until_index_changes(self):
+        """Число постов не пересчитывается до новой публикации"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url, {'page': 2})
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+        Post.objects.create(author=self.user, text='Новый пост')
+        page_obj = self.guest_client.get(url).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 14)
+
+
 class PostContextTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -180,7 +287,7 @@ class PostContextTests(TestCase):
                 self.assertEqual(is_edit_field, True)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, CACHES=TEMP_CACHES)
 class PostImageExistTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -198,6 +305,8 @@ class PostImageExistTest(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        cls.image_name = content_storage.hashed_name(
+            'posts/small.gif', ContentFile(small_gif))
         cls.user = User.objects.create_user(username='author')
         cls.group = Group.objects.create(
             title='Тестовый тайтл',
@@ -215,13 +324,14 @@ class PostImageExistTest(TestCase):
     def tearDownClass(cls):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
 
     def setUp(self):
         self.author_client = Client()
         self.author_client.force_login(self.user)
 
     def test_post_with_image_exist(self):
-        self.assertTrue(Post.objects.filter(image='posts/small.gif'))
+        self.assertTrue(Post.objects.filter(image=self.image_name))
 
     def test_index_show_correct_image_in_context(self):
         """В Шаблоне index картинка передается в словаре context"""
@@ -229,7 +339,7 @@ class PostImageExistTest(TestCase):
         response = self.author_client.get(reverse('posts:index'))
         test_object = response.context['page_obj'][0]
         post_image = test_object.image
-        self.assertEqual(post_image, 'posts/small.gif')
+        self.assertEqual(post_image, self.image_name)
 
     def test_post_detail_image_exist(self):
         """В шаблоне post_detail картинка передается в словаре context"""
@@ -238,7 +348,59 @@ class PostImageExistTest(TestCase):
         )
         test_object = response.context['post']
         post_image = test_object.image
-        self.assertEqual(post_image, 'posts/small.gif')
+        self.assertEqual(post_image, self.image_name)
+
+    def test_thumbnail_replaces_original_when_ready(self):
+        """До генерации миниатюры карточка показывает оригинал"""
+        cache.clear()
+        caches['thumbnails'].clear()
+        url = reverse('posts:index')
+        response = self.author_client.get(url)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        thumbnails.generate(self.post.id)
+        response = self.author_client.get(url)
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+        self.assertContains(
+            response, thumbnails.ready(self.post.image, 'card').url)
+
+    def test_page_thumbnails_are_resolved_at_once(self):
+        """Миниатюры и варианты страницы читаются двумя запросами"""
+        caches['thumbnails'].clear()
+        Post.objects.create(
+            text='Второй пост', author=self.user, image=self.post.image.name)
+        posts = list(Post.objects.all())
+        for post in posts:
+            thumbnails.generate(post.id)
+        caches['thumbnails'].clear()
+        with self.assertNumQueries(2):
+            thumbnails.resolve(posts)
+        self.assertTrue(all(post.thumbnail for post in posts))
+        self.assertTrue(all(post.sources for post in posts))
+
+    def test_card_lists_image_variants(self):
+        """Карточка предлагает браузеру варианты картинки через srcset"""
+        cache.clear()
+        thumbnails.generate(self.post.id)
+        self.assertEqual(
+            set(self.post.variants.values_list('format', flat=True)),
+            set(variants.available_formats()),
+        )
+        response = self.author_client.get(reverse('posts:index'))
+        for variant in self.post.variants.all():
+            with self.subTest(variant=variant):
+                self.assertContains(
+                    response, f'{variant.image.url} {variant.width}w')
+
+    def test_card_inlines_placeholder(self):
+        """Карточка встраивает заглушку и лениво грузит картинку"""
+        cache.clear()
+        call_command('generate_images', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.placeholder.startswith('data:image/jpeg;base64,'))
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.placeholder)
+        self.assertContains(response, 'loading="lazy"')
 
     def test_group_and_profile_image_exist(self):
         """В шаблонах group и profile картинка передается в словаре context"""
@@ -251,7 +413,7 @@ class PostImageExistTest(TestCase):
                 response = self.author_client.get(reverse(names, args=[args]))
                 test_object = response.context['page_obj'][0]
                 post_image = test_object.image
-                self.assertEqual(post_image, 'posts/small.gif')
+                self.assertEqual(post_image, self.image_name)
 
 
 class FollowTest(TestCase):
@@ -386,3 +548,65 @@ class CacheTest(TestCase):
         cache.clear()
         posts_count = Post.objects.count()
         self.assertEqual(len(response.context['page_obj']), posts_count)
+
+
+class QueryBudgetTest(TestCase):
+    budgets = {
+        'posts:index': 4,
+        'posts:group_list': 5,
+        'posts:profile': 6,
+        'posts:follow_index': 7,
+        'posts:post_detail': 4,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовый тайтл',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(25):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=cls.follower, author=author)
+            cls.post = Post.objects.create(
+                author=author,
+                text=f'Тестовый текст {number}',
+                group=cls.group,
+            )
+        for number in range(25):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f'author{number}'),
+                text=f'Тестовый комментарий {number}',
+            )
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def count_queries(self, name, args):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.follower_client.get(reverse(name, args=args))
+        return len(context)
+
+    def test_views_fit_query_budget(self):
+        """Число запросов не зависит от размера страницы"""
+        urls_args = {
+            'posts:index': [],
+            'posts:group_list': [self.group.slug],
+            'posts:profile': [self.post.author.username],
+            'posts:follow_index': [],
+            'posts:post_detail': [self.post.id],
+        }
+        for name, args in urls_args.items():
+            with self.subTest(name=name):
+                counts = set()
+                for per_page in (5, 10, 20):
+                    with self.settings(AMOUNT_POSTS=per_page):
+                        counts.add(self.count_queries(name, args))
+                self.assertEqual(len(counts), 1)
+                self.assertLessEqual(counts.pop(), self.budgets[name])
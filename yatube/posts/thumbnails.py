@@ -0,0 +1,168 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import cache, variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище ключей sorl с чтением многих записей за раз."""
+
+    def get_many(self, image_files):
+        """Словарь ключ -> ImageFile для найденных ``image_files``.
+
+        Сначала один get_many по кешу, промахи добираются одним
+        запросом к таблице и кешируются, как в _get_raw, в том числе
+        отсутствующие ключи.
+        """
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        values = self.cache.get_many(list(keys))
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            fetched = {
+                key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(fetched)
+        return {
+            keys[key]: deserialize_image_file(value)
+            for key, value in values.items()
+            if value and value != cached_db_kvstore.EMPTY_VALUE
+        }
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """Бэкенд sorl, который умеет не генерировать миниатюру в запросе."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры без обращения к хранилищу ключей.
+
+        Опции дополняются так же, как в get_thumbnail, иначе имя файла
+        миниатюры не совпадет с тем, что сохранил фоновый обработчик.
+        """
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached(self, file_, geometry_string, **options):
+        """Миниатюра из хранилища ключей или None, если ее еще нет."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+
+def ready(image, name):
+    """Готовая миниатюра вида ``name`` из THUMBNAIL_GEOMETRIES или None."""
+    if not image:
+        return None
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[name]
+    return default.backend.get_cached(image, geometry, **options)
+
+
+def names(image):
+    """Имена файлов миниатюр всех видов для картинки ``image``."""
+    return [
+        default.backend.thumbnail_file(image, geometry, **options).name
+        for geometry, options in settings.THUMBNAIL_GEOMETRIES.values()
+    ]
+
+
+def resolve(posts, name='card'):
+    """Проставляет постам миниатюры и варианты для srcset.
+
+    Миниатюры всех постов читаются одним чтением ключей, варианты —
+    одним запросом.
+    """
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[name]
+    files = {
+        post.id: default.backend.thumbnail_file(
+            post.image, geometry, **options)
+        for post in posts
+        if post.image
+    }
+    found = default.kvstore.get_many(files.values()) if files else {}
+    post_sources = variants.sources(list(files))
+    for post in posts:
+        image_file = files.get(post.id)
+        post.thumbnail = image_file and found.get(image_file.key)
+        post.sources = post_sources.get(post.id, [])
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр поста в очередь после коммита."""
+    transaction.on_commit(partial(_submit, post.id))
+
+
+def _submit(post_id):
+    if settings.THUMBNAIL_WORKERS:
+        _pool().submit(_run, post_id)
+    else:
+        generate(post_id)
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+    finally:
+        connection.close()
+
+
+def render(image):
+    """Создает миниатюры картинки для всех THUMBNAIL_GEOMETRIES."""
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES.values():
+        default.backend.get_thumbnail(image, geometry, **options)
+
+
+def generate(post_id):
+    """Создает миниатюры, варианты и заглушку, сбрасывает кеш карточки."""
+    post = Post.objects.select_related('author', 'group').filter(
+        id=post_id).first()
+    if post is None:
+        return
+    if post.image:
+        render(post.image)
+    variants.generate(post)
+    cache.bump_version(post.id)
+    scopes = ['index', cache.profile_scope(post.author.username)]
+    if post.group is not None:
+        scopes.append(cache.group_scope(post.group.slug))
+    cache.bump_generation(*scopes)
@@ -0,0 +1,150 @@
+import datetime as dt
+import json
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     Post)
+
+# Порядок важен: строки ссылаются только на уже выгруженные модели.
+MODELS = (
+    get_user_model(), Group, Post, Comment, Follow,
+    ArchivedPost, ArchivedComment,
+)
+
+
+class _Encoder(DjangoJSONEncoder):
+    """Как DjangoJSONEncoder, но даты без обрезки до миллисекунд."""
+
+    def default(self, o):
+        if isinstance(o, dt.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def export(stream, batch_size):
+    """Пишет строки MODELS в ``stream`` построчно в JSONL.
+
+    Каждая строка — {"model": метка, "fields": {столбец: значение}}.
+    Таблицы читаются через iterator() кусками по ``batch_size``,
+    так что память не зависит от их размера. Отдает тройки
+    (метка модели, выгружено строк, секунд с начала модели).
+    """
+    for model in MODELS:
+        label = model._meta.label_lower
+        started, count = time.monotonic(), 0
+        rows = model._default_manager.order_by('pk').values(*_columns(model))
+        for row in rows.iterator(chunk_size=batch_size):
+            stream.write(json.dumps(
+                {'model': label, 'fields': row},
+                cls=_Encoder, ensure_ascii=False,
+            ) + '\n')
+            count += 1
+            if count % batch_size == 0:
+                yield label, count, time.monotonic() - started
+        yield label, count, time.monotonic() - started
+
+
+@contextmanager
+def _keep_dates(model):
+    """Не дает auto_now и auto_now_add переписать даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _write(model, objects):
+    using = router.db_for_write(model)
+    with _keep_dates(model), transaction.atomic(using=using):
+        model._default_manager.using(using).bulk_create(
+            objects, ignore_conflicts=True)
+
+
+def _reset_sequences(models):
+    for model in models:
+        connection = connections[router.db_for_write(model)]
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def copy(models, source, batch_size):
+    """Копирует строки ``models`` из базы ``source`` в базу записи.
+
+    База записи берется у роутера, так что после включения
+    FOLLOW_DATABASE подписки и ленты переезжают из default в свою
+    базу. Уже скопированные строки пропускаются, поэтому прерванное
+    копирование можно повторить. Отдает тройки, как export.
+    """
+    for model in models:
+        label = model._meta.label_lower
+        started, count, batch = time.monotonic(), 0, []
+        rows = model._default_manager.using(source).order_by('pk').values(
+            *_columns(model))
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(model(**row))
+            count += 1
+            if len(batch) >= batch_size:
+                _write(model, batch)
+                batch = []
+                yield label, count, time.monotonic() - started
+        if batch:
+            _write(model, batch)
+        yield label, count, time.monotonic() - started
+    _reset_sequences(models)
+
+
+def load(stream, batch_size):
+    """Загружает JSONL из ``stream`` пачками по ``batch_size`` строк.
+
+    Каждая пачка пишется одним bulk_create в своей транзакции; строки
+    с уже занятым ключом пропускаются. Сигналы при этом не вызываются,
+    поэтому счетчики и ленты нужно пересчитать после загрузки. Отдает
+    тройки, как export.
+    """
+    model, batch, loaded = None, [], set()
+    started, count = time.monotonic(), 0
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        row_model = apps.get_model(record['model'])
+        if row_model is not model:
+            if batch:
+                _write(model, batch)
+                yield model._meta.label_lower, count, (
+                    time.monotonic() - started)
+            model, batch = row_model, []
+            loaded.add(model)
+            started, count = time.monotonic(), 0
+        batch.append(model(**record['fields']))
+        count += 1
+        if len(batch) >= batch_size:
+            _write(model, batch)
+            batch = []
+            yield model._meta.label_lower, count, time.monotonic() - started
+    if batch:
+        _write(model, batch)
+        yield model._meta.label_lower, count, time.monotonic() - started
+    _reset_sequences(loaded)
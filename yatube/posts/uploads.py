@@ -0,0 +1,74 @@
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+HEADER_BYTES = 256 * 1024
+
+
+class RejectedUpload(UploadedFile):
+    """Пустой файл вместо отклоненной загрузки, ``error`` — причина."""
+
+    def __init__(self, name, content_type, size, error):
+        super().__init__(BytesIO(), name, content_type, size)
+        self.error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Проверяет картинку по заголовку, пока она пишется на диск.
+
+    Стоит перед TemporaryFileUploadHandler и пропускает ему чанки,
+    пока файл укладывается в IMAGE_UPLOAD_MAX_BYTES, а формат и размеры
+    из заголовка — в IMAGE_UPLOAD_FORMATS и IMAGE_UPLOAD_MAX_PIXELS.
+    Иначе остаток файла отбрасывается без записи, а форма получает
+    RejectedUpload с причиной отказа.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.checked = False
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is None:
+            self.received += len(raw_data)
+            if self.received > settings.IMAGE_UPLOAD_MAX_BYTES:
+                limit = settings.IMAGE_UPLOAD_MAX_BYTES // 2 ** 20
+                self.error = f'Файл больше {limit} МБ.'
+            elif not self.checked:
+                self.header += raw_data[:HEADER_BYTES - len(self.header)]
+                self._check_header(final=len(self.header) >= HEADER_BYTES)
+        return None if self.error else raw_data
+
+    def file_complete(self, file_size):
+        if self.error is None and not self.checked:
+            self._check_header(final=True)
+        if self.error is None:
+            return None
+        return RejectedUpload(
+            self.file_name, self.content_type, self.received, self.error)
+
+    def _check_header(self, final):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                image = Image.open(BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.checked = True
+            self.error = 'Слишком большое разрешение картинки.'
+            return
+        except (OSError, SyntaxError, ValueError):
+            self.checked = final
+            if final:
+                self.error = 'Загрузите картинку.'
+            return
+        self.checked = True
+        if image.format not in settings.IMAGE_UPLOAD_FORMATS:
+            self.error = 'Формат картинки не поддерживается.'
+        elif image.width * image.height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.error = 'Слишком большое разрешение картинки.'
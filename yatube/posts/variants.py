@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .encoding import encode
+from .models import ImageVariant, Post
+
+_executor = None
+
+
+def available_formats():
+    """Форматы из IMAGE_VARIANT_FORMATS, которые умеет писать Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.IMAGE_VARIANT_FORMATS
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # Пул создается из потока веб-процесса: fork скопировал бы
+        # блокировки, занятые другими потоками, поэтому forkserver.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_PROCESSES,
+            mp_context=multiprocessing.get_context('forkserver'),
+        )
+    return _executor
+
+
+def _ratio():
+    geometry, options = settings.THUMBNAIL_GEOMETRIES['card']
+    width, height = map(int, geometry.split('x'))
+    return height / width
+
+
+def _share(post):
+    """Берет варианты и заглушку у другого поста с тем же файлом."""
+    donor = Post.objects.filter(image=post.image.name).exclude(
+        id=post.id).exclude(placeholder='').order_by('id').first()
+    if donor is None:
+        return False
+    ImageVariant.objects.bulk_create(
+        ImageVariant(
+            post=post, format=variant.format, width=variant.width,
+            image=variant.image.name,
+        )
+        for variant in donor.variants.all()
+    )
+    post.placeholder = donor.placeholder
+    return True
+
+
+def _encode(post):
+    try:
+        with post.image.open('rb') as image:
+            data = image.read()
+    except OSError:
+        return
+    args = (
+        data,
+        settings.IMAGE_VARIANT_WIDTHS,
+        _ratio(),
+        available_formats(),
+        settings.IMAGE_VARIANT_QUALITY,
+        settings.IMAGE_PLACEHOLDER_WIDTH,
+    )
+    if settings.IMAGE_VARIANT_PROCESSES:
+        encoded, post.placeholder = _pool().submit(encode, *args).result()
+    else:
+        encoded, post.placeholder = encode(*args)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = []
+    for image_format, width, content in encoded:
+        variant = ImageVariant(post=post, format=image_format, width=width)
+        variant.image.save(
+            f'{stem}-{width}.{image_format}', ContentFile(content), save=False)
+        variants.append(variant)
+    ImageVariant.objects.bulk_create(variants)
+
+
+def generate(post):
+    """Пересоздает варианты и заглушку картинки поста.
+
+    Если та же картинка уже есть у другого поста, его варианты
+    и заглушка переиспользуются без перекодирования.
+    """
+    post.variants.all().delete()
+    post.placeholder = ''
+    if post.image and not _share(post):
+        _encode(post)
+    Post.objects.filter(id=post.id).update(placeholder=post.placeholder)
+
+
+def sources(post_ids):
+    """Словарь id поста -> [(MIME-тип, srcset)] одним запросом."""
+    if not post_ids:
+        return {}
+    srcsets = defaultdict(lambda: defaultdict(list))
+    rows = ImageVariant.objects.filter(post_id__in=post_ids).order_by(
+        'width').values_list('post_id', 'format', 'width', 'image')
+    storage = ImageVariant._meta.get_field('image').storage
+    for post_id, image_format, width, name in rows:
+        srcsets[post_id][image_format].append(
+            f'{storage.url(name)} {width}w')
+    return {
+        post_id: [
+            (f'image/{image_format}', ', '.join(formats[image_format]))
+            for image_format in settings.IMAGE_VARIANT_FORMATS
+            if image_format in formats
+        ]
+        for post_id, formats in srcsets.items()
+    }
@@ -1,32 +1,34 @@
+from core.routers import read_only
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from users.models import Profile
 
+from . import feeds, search, thumbnails
+from .cache import cache_listing, group_scope, profile_scope
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import ArchivedPost, Follow, Group, Post, User
+from .paginators import MergedKeysetPaginator, paginate
 
 
-@cache_page(20, key_prefix='index_page')
+@read_only
+@cache_listing('index')
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, settings.AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    page_obj = paginate(request, posts, count_scope='index')
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_only
+@cache_listing(group_scope)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = paginate(request, post_list, count_scope=group_scope(slug))
     context = {
         'page_obj': page_obj,
         'group': group
@@ -34,34 +36,68 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_only
+@cache_listing(profile_scope)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    paginator = Paginator(post_list, settings.AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    user = get_object_or_404(
+        User.objects.select_related('profile'), username=username)
+    profile = Profile.for_user(user)
+    # Архив читается, только если у автора есть архивные посты:
+    # у остальных профиль обходится одной горячей таблицей.
+    keys = ('pub_date', 'id')
+    streams = [(user.posts.select_related('author', 'group'), keys)]
+    if profile.archived_posts_count:
+        streams.append(
+            (user.archived_posts.select_related('author', 'group'), keys))
+    count_posts = profile.all_posts_count
+    page_obj = paginate(
+        request,
+        streams,
+        paginator_class=MergedKeysetPaginator,
+        count=count_posts,
+    )
     if request.user.is_authenticated:
         following = Follow.objects.filter(
-            user=request.user, author=user)
+            user=request.user, author=user).exists()
     else:
         following = False
     context = {
         'page_obj': page_obj,
-        'count_posts': user.posts.count(),
+        'count_posts': count_posts,
         'author': user,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_only
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search.search(
+        query, request.GET.get('after'), settings.AMOUNT_POSTS)
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@read_only
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = Post.objects.select_related(
+        'author__profile', 'group').filter(id=post_id).first()
+    if post is None:
+        post = get_object_or_404(
+            ArchivedPost.objects.select_related('author__profile', 'group'),
+            id=post_id,
+        )
     form = CommentForm()
-    comments = post.comments.all()
-    current_author = post.author
-    count_posts = current_author.posts.all().count()
+    comments = post.comments.select_related('author')
+    count_posts = Profile.for_user(post.author).all_posts_count
     context = {
         'post': post,
+        'archived': isinstance(post, ArchivedPost),
         'count_posts': count_posts,
         'form': form,
         'comments': comments,
@@ -83,6 +119,8 @@ def post_create(request):
     object = form.save(commit=False)
     object.author = request.user
     object.save()
+    if object.image:
+        thumbnails.schedule(object)
     return redirect(
         reverse('posts:profile', kwargs={'username': object.author}))
 
@@ -99,6 +137,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -121,12 +161,15 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_only
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request,
+        feeds.streams(request.user),
+        paginator_class=MergedKeysetPaginator,
+        transform=feeds.load_posts,
+    )
     context = {
         'page_obj': page_obj,
     }
@@ -148,5 +191,3 @@ def profile_unfollow(request, username):
     if request.method != 'POST':
         unfollowing.delete()
     return redirect('posts:profile', author)
-
-
@@ -1,3 +1,15 @@
+from core.admin import PrefixSearchMixin
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
+User = get_user_model()
 
-# Register your models here.
+
+class PrefixUserAdmin(PrefixSearchMixin, UserAdmin):
+    search_fields = ('username',)
+    prefix_search_fields = ('username',)
+
+
+admin.site.unregister(User)
+admin.site.register(User, PrefixUserAdmin)
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='archived_posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Постов в архиве'),
+        ),
+    ]
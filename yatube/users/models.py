@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -7,3 +8,49 @@ class Contact(models.Model):
     subject = models.CharField(max_length=100)
     body = models.TextField()
     is_answered = models.BooleanField(default=False)
+
+
+class Profile(models.Model):
+    """Счетчики пользователя, которые обновляются при записи."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Постов',
+        default=0
+    )
+    archived_posts_count = models.PositiveIntegerField(
+        'Постов в архиве',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user_id)
+
+    @property
+    def all_posts_count(self):
+        """Посты автора вместе с перенесенными в архив."""
+        return self.posts_count + self.archived_posts_count
+
+    @classmethod
+    def for_user(cls, user):
+        try:
+            return user.profile
+        except cls.DoesNotExist:
+            return cls.objects.get_or_create(user=user)[0]
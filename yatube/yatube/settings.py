@@ -11,10 +11,13 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -57,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.routers.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -88,7 +92,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    }
+}
+
+# Реплики только для чтения: пути к копиям базы через запятую.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.getenv(
+        'DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Отдельная база для подписок и лент, путь к файлу SQLite. Сначала
+# migrate --database follows, потом migrate; на уже работающей базе
+# после этого copy_follows переносит существующие подписки и ленты.
+FOLLOW_DATABASE = None
+FOLLOW_MODELS = ('posts.follow', 'posts.feedentry')
+if os.getenv('DB_FOLLOWS'):
+    FOLLOW_DATABASE = 'follows'
+    DATABASES[FOLLOW_DATABASE] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_FOLLOWS'),
     }
+
+DATABASE_ROUTERS = [
+    'core.routers.FollowRouter',
+    'core.routers.ReplicaRouter',
+]
+REPLICA_PIN_SECONDS = 10
+
+# Применяются к каждому новому соединению, см. core.db.configure_sqlite.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 2 ** 20,
+    'cache_size': -64 * 2 ** 10,
 }
 
 
@@ -139,17 +183,85 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 AMOUNT_POSTS = 10
+PAGINATOR_OFFSET_DEPTH = 10
+PAGINATOR_WINDOW = 2
+PAGINATOR_COUNT_TIMEOUT = 60 * 5
+PAGINATOR_ESTIMATE_FROM = 100000
+
+FEED_RETENTION_DAYS = 365
+FEED_BATCH_SIZE = 1000
+FEED_PULL_THRESHOLD = 10000
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_MAX_BYTES = 10 * 2 ** 20
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 10 ** 6
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_SHARD_DEPTH = 2
+MEDIA_BATCH_SIZE = 500
+
+TRANSFER_BATCH_SIZE = 2000
+
+# Поколения страниц и версии карточек должны быть общими для всех
+# воркеров, поэтому в бою default — общий кеш, например memcached:
+# CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# CACHE_LOCATION=127.0.0.1:11211. LocMemCache живет в одном процессе.
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', LOCMEM_CACHE)
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'OPTIONS': {'MAX_ENTRIES': 10000} if CACHE_BACKEND == LOCMEM_CACHE
+        else {},
+    },
+    'thumbnails': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'thumbnails'),
+        'TIMEOUT': None,
+        # Около трех ключей sorl на картинку; при стандартных 300
+        # записях кеш начинал бы вычищать треть файлов уже на сотне
+        # картинок, и чтения миниатюр уходили бы в базу.
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('THUMBNAIL_CACHE_ENTRIES', 300000)),
+        },
+    },
+}
+
+# С LocMemCache bump_generation и bump_version видит только воркер,
+# обработавший запись, поэтому остальные воркеры отдают устаревшие
+# страницы и карточки не дольше этих коротких таймаутов.
+SHARED_CACHE = CACHE_BACKEND != LOCMEM_CACHE
+POST_CARD_TIMEOUT = 60 * 60 if SHARED_CACHE else 20
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+THUMBNAIL_CACHE = 'thumbnails'
+# Миниатюры и варианты картинок создаются в фоновых потоках, чтобы
+# работа Pillow не занимала веб-воркер. В тестах — сразу после коммита
+# в том же запросе, без фоновых записей в MEDIA_ROOT после теста.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 0 if TESTING else 2))
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
 }
+IMAGE_VARIANT_PROCESSES = int(
+    os.getenv('IMAGE_VARIANT_PROCESSES', 0 if TESTING else 2))
+IMAGE_VARIANT_FORMATS = ('avif', 'webp')
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_PLACEHOLDER_WIDTH = 16
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 20